@@ -0,0 +1,201 @@
+"""
+NeuralNetwork 的训练数据
+
+CSV（例如 MNIST 的 CSV 版本，每行第一列是标签，后面是 784 个像素值）只在第一次
+用 csv_to_npy() 转换成 .npy 二进制文件，之后用 MemmapDataset 以内存映射的方式读取：
+- 不需要把整个数据集读进内存，比内存还大的数据集也能训练，读取速度只受磁盘限制
+- 每个批次是文件中连续的若干行，取出来只是 memmap 的一个切片（不复制）；
+  打乱的是批次的顺序，转换时可以用 shuffle=True 把行顺序也预先打乱一次
+- 缩放（例如像素 0~255 -> 0.01~1.0）直接写进预先分配好的缓冲区，不为每个批次分配新数组
+- prefetch=True 时由后台线程提前准备下一批，训练和读盘同时进行
+
+用法：
+    python dataset.py mnist_train.csv mnist_train.npy
+
+    dataset = MemmapDataset("mnist_train.npy", label_column=0, num_classes=10)
+    for inputs, targets in dataset.batches(100, prefetch=True):
+        n.train(inputs, targets)
+"""
+import itertools
+import queue
+import sys
+import threading
+
+import numpy
+
+
+def csv_to_npy(csv_path, npy_path, dtype=numpy.uint8, skip_header=0, chunk_rows=10000, shuffle=False, seed=None):
+    """
+    把 CSV 分块转换成 .npy 文件，整个过程只占用 chunk_rows 行的内存
+    shuffle=True 时按随机顺序写入各行。返回数据的形状 (行数, 列数)
+    """
+    with open(csv_path) as f:
+        for _ in range(skip_header):
+            next(f)
+        first = f.readline()
+        columns = len(first.split(","))
+        rows = 1 + sum(1 for line in f if line.strip())
+
+    order = numpy.random.default_rng(seed).permutation(rows) if shuffle else None
+    out = numpy.lib.format.open_memmap(npy_path, mode="w+", dtype=dtype, shape=(rows, columns))
+    with open(csv_path) as f:
+        for _ in range(skip_header):
+            next(f)
+        lines = (line for line in f if line.strip())
+        start = 0
+        while start < rows:
+            chunk = numpy.loadtxt(itertools.islice(lines, chunk_rows), delimiter=",", dtype=dtype, ndmin=2)
+            end = start + len(chunk)
+            if order is None:
+                out[start:end] = chunk
+            else:
+                out[order[start:end]] = chunk
+            start = end
+    out.flush()
+    del out
+    return rows, columns
+
+
+class MemmapDataset:
+    """
+    以内存映射方式读取 csv_to_npy() 生成的 .npy 文件
+
+    label_column 不为 None 时，该列是类别标签，其余列是输入；batches() 同时给出
+    one-hot 目标值（正确类别为 on_value，其余为 off_value，与 sigmoid 输出的范围相符）
+    """
+
+    def __init__(self, path, label_column=None, num_classes=None):
+        self.data = numpy.load(path, mmap_mode="r")
+        self.label_column = label_column
+        self.num_classes = num_classes
+        if label_column is not None:
+            if num_classes is None:
+                raise ValueError("指定 label_column 时需要给出 num_classes")
+            # 除标签外的列；标签在第一列或最后一列时是一个连续的范围，切片不复制
+            columns = self.data.shape[1]
+            label_column %= columns
+            if label_column == 0:
+                self.input_columns = slice(1, columns)
+            elif label_column == columns - 1:
+                self.input_columns = slice(0, columns - 1)
+            else:
+                self.input_columns = [i for i in range(columns) if i != label_column]
+            self.label_column = label_column
+        else:
+            self.input_columns = slice(None)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def input_size(self):
+        return self.data[:1, self.input_columns].shape[1]
+
+    def _iter_batches(self, batch_size, shuffle, seed, scale, offset, on_value, off_value, dtype, buffers):
+        rows = len(self)
+        starts = numpy.arange(0, rows, batch_size)
+        if shuffle:
+            numpy.random.default_rng(seed).shuffle(starts)
+
+        # 轮流使用的缓冲区：预取时消费者还在用上一批，生产者同时在填下一批
+        input_buffers = [numpy.empty((batch_size, self.input_size), dtype=dtype) for _ in range(buffers)]
+        target_buffers = None
+        if self.label_column is not None:
+            target_buffers = [numpy.empty((batch_size, self.num_classes), dtype=dtype) for _ in range(buffers)]
+
+        # 不需要转换类型和缩放时直接给出 memmap 的切片（只读）
+        as_view = (
+            self.label_column is None and scale == 1.0 and not offset
+            and numpy.dtype(dtype) == self.data.dtype
+        )
+
+        for i, start in enumerate(starts):
+            block = self.data[start:start + batch_size]
+            size = len(block)
+            if as_view:
+                yield block
+                continue
+            inputs = input_buffers[i % buffers][:size]
+            # 先原样拷贝（同时完成类型转换），再原地缩放和平移
+            numpy.copyto(inputs, block[:, self.input_columns], casting="unsafe")
+            if scale != 1.0:
+                inputs *= scale
+            if offset:
+                inputs += offset
+            if self.label_column is None:
+                yield inputs
+                continue
+            targets = target_buffers[i % buffers][:size]
+            targets.fill(off_value)
+            targets[numpy.arange(size), block[:, self.label_column].astype(numpy.intp)] = on_value
+            yield inputs, targets
+
+    def batches(
+        self, batch_size, shuffle=True, seed=None, scale=0.99 / 255.0, offset=0.01,
+        on_value=0.99, off_value=0.01, dtype=numpy.float32, prefetch=False,
+    ):
+        """
+        逐批给出 inputs（有标签列时给出 (inputs, targets)），inputs = 原始值 * scale + offset
+        默认的 scale / offset 把 0~255 的像素值变成 0.01~1.0
+
+        给出的数组是复用的缓冲区，只在处理这一批期间有效，需要保留时请自行 copy()
+        """
+        if not prefetch:
+            return self._iter_batches(batch_size, shuffle, seed, scale, offset, on_value, off_value, dtype, buffers=1)
+        # 一批在消费者手里、一批在队列里、一批正在填充
+        batches = self._iter_batches(batch_size, shuffle, seed, scale, offset, on_value, off_value, dtype, buffers=3)
+        return _prefetch(batches)
+
+
+# 通知消费者数据已经取完
+_DONE = object()
+
+
+def _prefetch(batches):
+    """在后台线程中迭代 batches，最多提前准备一批"""
+    ready = queue.Queue(maxsize=1)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for batch in batches:
+                while not stop.is_set():
+                    try:
+                        ready.put(batch, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            item = _DONE
+        except BaseException as e:
+            item = e
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    thread = threading.Thread(target=produce, name="dataset-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # 消费者提前退出循环时让后台线程也结束
+        stop.set()
+        thread.join()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("用法: python dataset.py <输入.csv> <输出.npy>")
+        sys.exit(1)
+    shape = csv_to_npy(sys.argv[1], sys.argv[2])
+    print(f"已转换 {shape[0]} 行，每行 {shape[1]} 列")
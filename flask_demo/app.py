@@ -1,14 +1,32 @@
-from flask import Flask, render_template, request, redirect, url_for
+import queue
+
+from flask import Flask, render_template, request, redirect, url_for, abort
+
+from compression import init_compression
+from contacts import init_contacts
+from page_cache import init_page_cache, render_cached, render_static, user_pages
+from users import DEFAULT_LIMIT, MAX_LIMIT, init_users
 
 app = Flask(__name__)
+# 读取 FLASK_ 开头的环境变量作为配置，例如
+# FLASK_TEMPLATE_BYTECODE_DIR=/tmp/jinja-cache FLASK_PRECOMPILE_TEMPLATES=true
+app.config.from_prefixed_env()
+# 按 Accept-Encoding 压缩响应
+init_compression(app)
+# 模板字节码缓存 / 启动时预编译模板
+init_page_cache(app)
+# 用户数据（SQLite）
+users = init_users(app)
+# 联系表单由后台线程批量写入
+contacts = init_contacts(app)
 
 @app.route('/')
 def home():
-    return render_template('index.html')
+    return render_static('index.html')
 
 @app.route('/about')
 def about():
-    return render_template('about.html')
+    return render_static('about.html')
 
 @app.route('/contact', methods=['GET', 'POST'])
 def contact():
@@ -16,31 +34,35 @@ def contact():
         name = request.form['name']
         email = request.form['email']
         message = request.form['message']
+        try:
+            contacts.submit(name, email, message)
+        except queue.Full:
+            # 写库跟不上，让客户端稍后重试
+            return "提交的人太多了，请稍后再试", 503, {'Retry-After': '5'}
         return render_template('contact_success.html', name=name)
     return render_template('contact.html')
 
 @app.route('/api/users')
 def api_users():
-    users = [
-        {'id': 1, 'name': 'Alice', 'email': 'alice@example.com'},
-        {'id': 2, 'name': 'Bob', 'email': 'bob@example.com'},
-        {'id': 3, 'name': 'Charlie', 'email': 'charlie@example.com'}
-    ]
-    return users
+    """用户列表，按 id 分页：/api/users?limit=20&after_id=上一页的 next_after_id"""
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    after_id = request.args.get('after_id', 0, type=int)
+    if not 1 <= limit <= MAX_LIMIT or after_id < 0:
+        abort(400, f'limit 必须在 1 到 {MAX_LIMIT} 之间，after_id 不能为负数')
+    items, next_after_id = users.list(limit, after_id)
+    return {'items': items, 'next_after_id': next_after_id}
 
 @app.route('/user/<int:user_id>')
 def user_profile(user_id):
-    users = {
-        1: {'name': 'Alice', 'email': 'alice@example.com', 'age': 25},
-        2: {'name': 'Bob', 'email': 'bob@example.com', 'age': 30},
-        3: {'name': 'Charlie', 'email': 'charlie@example.com', 'age': 35}
-    }
     user = users.get(user_id)
     if user:
-        return render_template('user_profile.html', user=user, user_id=user_id)
+        # 按 user_id 缓存渲染结果；用户资料改过后缓存的页面失效
+        return render_cached(
+            user_pages, user_id, 'user_profile.html',
+            version=tuple(user.values()), user=user, user_id=user_id,
+        )
     else:
         return "用户未找到", 404
 
-
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,91 @@
+"""
+响应压缩
+
+在 after_request 钩子里按 Accept-Encoding 协商 br / zstd / gzip 并压缩响应。
+首页、关于页这类内容不变的页面，每次渲染出的字节都一样，所以压缩结果按
+响应内容的哈希缓存起来（LRU），同样的内容只压缩一次。
+小于 MIN_SIZE 的响应压缩收益很小，直接原样返回。
+
+brotli 和 zstandard 都是可选依赖，没有安装时对应编码不参与协商。
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 小于这个字节数的响应不压缩
+MIN_SIZE = 1024
+# 最多缓存多少份压缩结果
+CACHE_SIZE = 256
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+# 服务端偏好顺序，客户端 q 值相同时按这个顺序选
+ENCODINGS = [
+    encoding for encoding, module in (("br", brotli), ("zstd", zstandard), ("gzip", gzip))
+    if module is not None
+]
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compress(body, encoding):
+    """结果会被缓存复用，所以用较高的压缩级别"""
+    if encoding == "br":
+        return brotli.compress(body, quality=9)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=12).compress(body)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def compress_response(response):
+    if (
+        response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or not response.mimetype.startswith(COMPRESSIBLE_TYPES)
+    ):
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_SIZE:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+    with _cache_lock:
+        compressed = _cache.get(key)
+        if compressed is not None:
+            _cache.move_to_end(key)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        with _cache_lock:
+            _cache[key] = compressed
+            if len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app):
+    """为 Flask 应用开启响应压缩"""
+    app.after_request(compress_response)
@@ -0,0 +1,155 @@
+"""
+联系表单的保存
+
+提交的表单不在请求里直接写库，而是放进一个有界队列后立即返回，由后台线程批量写入
+SQLite（默认 instance/contacts.db，可以用 CONTACTS_DATABASE 配置其他路径）：
+- 攒够 BATCH_SIZE 条或距离这一批的第一条超过 FLUSH_INTERVAL 秒就写一次，一批只提交一个事务
+- 队列满时最多等 SUBMIT_TIMEOUT 秒，还是满的就抛出 queue.Full，由调用方返回 503，
+  避免写库跟不上时内存无限增长
+- 进程退出时把队列里剩下的写完
+
+后台线程在第一次提交时才启动，所以预加载应用后 fork 出的 worker 也各自有自己的写线程。
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# 队列最多容纳的待写入表单数
+QUEUE_SIZE = 10000
+# 一批最多写入多少条
+BATCH_SIZE = 200
+# 一批最多等多少秒
+FLUSH_INTERVAL = 0.5
+# 队列满时提交最多等待的秒数
+SUBMIT_TIMEOUT = 0.1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+INSERT_CONTACT = "INSERT INTO contacts (name, email, message, created_at) VALUES (?, ?, ?, ?)"
+
+# 通知写线程退出
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class ContactWriter:
+    """把表单放进队列，由后台线程批量写入数据库"""
+
+    def __init__(self, path, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_schema(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                conn.execute(SCHEMA)
+        finally:
+            conn.close()
+
+    def submit(self, name, email, message, timeout=SUBMIT_TIMEOUT):
+        """提交一份表单；队列满且等待 timeout 秒后仍然满时抛出 queue.Full"""
+        self._ensure_started()
+        self.queue.put((name, email, message, time.time()), timeout=timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                # fork 之后父进程的队列内容和线程都不属于这个进程
+                if self._pid is not None:
+                    self.queue = queue.Queue(maxsize=self.queue.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="contact-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        try:
+            stopping = False
+            while not stopping:
+                item = self.queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._write(conn, batch)
+            # 收到退出通知后，把之后还在队列里的也写掉
+            rest = []
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    rest.append(item)
+            if rest:
+                self._write(conn, rest)
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(INSERT_CONTACT, batch)
+        except sqlite3.Error as e:
+            # 写库失败只丢掉这一批，写线程继续工作
+            logger.error("保存 %d 条联系表单失败: %s", len(batch), e)
+
+    def close(self, timeout=5.0):
+        """写完队列里的表单后停止写线程"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        # 队列满时也要保证退出通知能放进去
+        while True:
+            try:
+                self.queue.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:
+                if not thread.is_alive():
+                    return
+        thread.join(timeout)
+
+
+def init_contacts(app):
+    """创建联系表单的写入器，进程退出时自动写完剩余的表单"""
+    path = app.config.get('CONTACTS_DATABASE') or os.path.join(app.instance_path, 'contacts.db')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = ContactWriter(path)
+    writer.init_schema()
+    atexit.register(writer.close)
+    return writer
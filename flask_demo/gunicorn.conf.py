@@ -0,0 +1,53 @@
+"""
+生产环境启动配置（gunicorn）
+
+    cd flask_demo
+    gunicorn -c gunicorn.conf.py
+
+app.run(debug=True) 只适合开发。这里用 gunicorn 的多进程 + 多线程 worker：
+- master 进程监听端口，worker 共享同一个 socket
+- preload_app：master 先导入 app（编译好全部模板、建好用户库）再 fork，
+  worker 以写时复制的方式共享编译好的模板
+- 每个 worker 处理 max_requests（加上随机抖动）个请求后重启
+- kill -HUP <master pid>：逐个启动新 worker、优雅停止旧 worker，端口不断开；
+  更新了代码时用 kill -USR2 <master pid> 启动新的 master，确认正常后对旧 master 发
+  kill -QUIT（preload_app 下 HUP 不会重新导入代码）
+
+以下配置都可以用环境变量覆盖。
+"""
+import gc
+import multiprocessing
+import os
+
+# 启动时编译全部模板（在 fork 之前完成）
+os.environ.setdefault("FLASK_PRECOMPILE_TEMPLATES", "true")
+
+wsgi_app = "app:app"
+# 每个进程开几个线程，等数据库等 I/O 时其他线程可以继续处理请求
+worker_class = "gthread"
+threads = int(os.environ.get("THREADS", "4"))
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+backlog = int(os.environ.get("BACKLOG", "2048"))
+
+preload_app = True
+
+max_requests = int(os.environ.get("MAX_REQUESTS", "10000"))
+# 避免所有 worker 同时重启
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "1000"))
+
+# 优雅停止时等正在处理的请求结束的最长时间；退出前联系表单的写线程会写完队列
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("TIMEOUT", "30"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+
+accesslog = os.environ.get("ACCESS_LOG")
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+
+def pre_fork(server, worker):
+    # 把预加载阶段创建的对象移出垃圾回收的跟踪范围，worker 里的 GC 不会去改这些对象的
+    # 头部，共享的内存页就不会因为 GC 被复制
+    gc.freeze()
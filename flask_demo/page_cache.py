@@ -0,0 +1,142 @@
+"""
+页面渲染缓存
+
+- 首页、关于页这类静态页面渲染一次后缓存整页 HTML
+- 用户资料页按 user_id 缓存，条目数有上限，超出时淘汰最久没访问的（LRU）
+- 缓存条目记录了渲染时所用模板（包括 extends / include 的模板）的修改时间，
+  开启模板自动重新加载（debug 模式）时，模板一改缓存就失效；
+  关闭时认为模板不会变化，不再检查文件
+- 配置 TEMPLATE_BYTECODE_DIR 时把编译好的模板字节码存到该目录，进程重启后不用重新编译；
+  PRECOMPILE_TEMPLATES 为 True 时在启动时编译全部模板，第一个请求不用等编译
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app, render_template, request
+from jinja2 import FileSystemBytecodeCache, meta
+
+# 静态页面最多缓存多少页
+STATIC_CACHE_SIZE = 64
+# 最多缓存多少个用户的资料页
+USER_CACHE_SIZE = 1024
+
+# 模板名 -> (文件路径, 修改时间, 引用的其他模板)
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+static_pages = LRUCache(STATIC_CACHE_SIZE)
+user_pages = LRUCache(USER_CACHE_SIZE)
+
+
+def _template_info(env, name):
+    """返回模板的 (文件路径, 修改时间, 引用的模板)，文件没变时不重新解析"""
+    info = _templates.get(name)
+    if info is not None:
+        try:
+            if os.stat(info[0]).st_mtime_ns == info[1]:
+                return info
+        except OSError:
+            pass
+    source, filename, _ = env.loader.get_source(env, name)
+    # 动态的模板名（变量）解析不出来，返回 None，跳过
+    refs = tuple(ref for ref in meta.find_referenced_templates(env.parse(source)) if ref)
+    info = (filename, os.stat(filename).st_mtime_ns, refs)
+    with _templates_lock:
+        _templates[name] = info
+    return info
+
+
+def template_stamp(env, name):
+    """模板及其引用的所有模板的修改时间；不自动重新加载模板时返回空元组"""
+    if not env.auto_reload:
+        return ()
+    stamp = []
+    pending = [name]
+    seen = set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        filename, mtime, refs = _template_info(env, current)
+        stamp.append((current, mtime))
+        pending.extend(refs)
+    return tuple(stamp)
+
+
+def render_cached(cache, key, template_name, version=None, **context):
+    """
+    渲染模板并按 key 缓存结果
+    模板改动、应用挂载路径不同（url_for 生成的链接不同）或 version 变化时重新渲染；
+    页面内容来自数据库等会变的数据时，把这些数据（或其版本号）作为 version 传入
+    """
+    stamp = (request.script_root, version, template_stamp(current_app.jinja_env, template_name))
+    entry = cache.get(key)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    html = render_template(template_name, **context)
+    cache.set(key, (stamp, html))
+    return html
+
+
+def render_static(template_name):
+    """渲染不依赖请求参数的静态页面"""
+    return render_cached(static_pages, template_name, template_name)
+
+
+def precompile_templates(app):
+    """编译所有模板，放进 Jinja 的模板缓存（配置了字节码目录时同时写入字节码）"""
+    env = app.jinja_env
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    # 模板缓存默认只保留 400 个，确保预编译的都能留住
+    if getattr(env.cache, "capacity", len(names)) < len(names):
+        env.cache.capacity = len(names)
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+def init_page_cache(app):
+    """按配置开启模板字节码缓存和启动时预编译"""
+    bytecode_dir = app.config.get("TEMPLATE_BYTECODE_DIR")
+    if bytecode_dir:
+        os.makedirs(bytecode_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+    if app.config.get("PRECOMPILE_TEMPLATES"):
+        precompile_templates(app)
@@ -0,0 +1,100 @@
+"""
+用户数据
+
+用户保存在本地 SQLite 数据库里（默认 instance/users.db，可以用 USERS_DATABASE 配置其他路径）：
+- id 是 INTEGER PRIMARY KEY，也就是 SQLite 的 rowid，按 id 查询和按 id 顺序翻页都直接走主键索引
+- 列表用 keyset 分页：WHERE id > after_id ORDER BY id LIMIT n，翻到多深都一样快，
+  不像 OFFSET 那样要先跳过前面所有行
+- 每个线程（每个 worker）复用一个连接，不在每个请求里重新打开；
+  SQL 语句都是固定的带 ? 参数的字符串，sqlite3 会缓存编译好的语句，重复执行时不再解析
+- 数据库为空时写入示例用户
+"""
+import os
+import sqlite3
+import threading
+
+# 列表接口每页的默认数量和最大数量
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# 每个连接缓存的已编译语句数
+CACHED_STATEMENTS = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    age INTEGER
+)
+"""
+
+SAMPLE_USERS = [
+    (1, 'Alice', 'alice@example.com', 25),
+    (2, 'Bob', 'bob@example.com', 30),
+    (3, 'Charlie', 'charlie@example.com', 35),
+]
+
+GET_USER = "SELECT name, email, age FROM users WHERE id = ?"
+LIST_USERS = "SELECT id, name, email FROM users WHERE id > ? ORDER BY id LIMIT ?"
+
+
+class UserRepository:
+    """用户的查询入口，可以在多个线程之间共享"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self):
+        """当前线程的连接；fork 出来的子进程不能沿用父进程的连接，重新打开"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, cached_statements=CACHED_STATEMENTS)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            local.conn = conn
+            local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def init_schema(self):
+        conn = self.connection()
+        with conn:
+            conn.execute(SCHEMA)
+            if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
+                conn.executemany("INSERT INTO users (id, name, email, age) VALUES (?, ?, ?, ?)", SAMPLE_USERS)
+
+    def get(self, user_id):
+        """按 id 取用户，不存在时返回 None"""
+        row = self.connection().execute(GET_USER, (user_id,)).fetchone()
+        if row is None:
+            return None
+        return {'name': row[0], 'email': row[1], 'age': row[2]}
+
+    def list(self, limit=DEFAULT_LIMIT, after_id=0):
+        """
+        返回 id 大于 after_id 的前 limit 个用户和下一页的 after_id（没有下一页时为 None）
+        多查一行用来判断是否还有下一页
+        """
+        rows = self.connection().execute(LIST_USERS, (after_id, limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        users = [{'id': row[0], 'name': row[1], 'email': row[2]} for row in rows[:limit]]
+        next_after_id = users[-1]['id'] if has_more else None
+        return users, next_after_id
+
+
+def init_users(app):
+    """创建用户库（需要时建表并写入示例数据）"""
+    path = app.config.get('USERS_DATABASE') or os.path.join(app.instance_path, 'users.db')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    repository = UserRepository(path)
+    repository.init_schema()
+    # 建表用的连接属于启动线程，之后的请求各自打开自己的连接
+    repository.close()
+    return repository
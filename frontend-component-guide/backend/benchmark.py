@@ -0,0 +1,265 @@
+"""
+组件 API 压测
+
+生成指定规模的合成组件目录，对 /api/components、/api/components/{id}、
+/api/categories 按设定的并发发请求，输出吞吐量、p50/p95/p99 延迟和服务进程的
+常驻内存（RSS），用于发现性能回退和估算 worker 数量。
+
+两种运行方式：
+- inprocess：通过 ASGI 直接调用 app，不经过网络，测的是应用本身的开销
+- uvicorn：启动真正的 uvicorn 进程（可多 worker），通过本地端口压测
+
+需要额外安装 httpx：pip install httpx
+
+用法：
+    python benchmark.py                                  # 默认 100 / 1万 / 10万 个组件，进程内
+    python benchmark.py --mode uvicorn --workers 4 --concurrency 64
+    python benchmark.py --sizes 10000 --requests 5000 --json result.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+import storage
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 合成数据用的词表，属性名 / 类型 / 说明在真实目录中大量重复
+CATEGORIES = ["general", "basic", "layout", "navigation", "data_entry", "data_display", "feedback", "chart", "media", "other"]
+WORDS = ["table", "form", "list", "card", "tree", "menu", "tag", "badge", "panel", "grid", "step", "tab", "picker", "upload", "slider"]
+ZH_WORDS = ["表格", "表单", "列表", "卡片", "树", "菜单", "标签", "徽标", "面板", "栅格", "步骤", "标签页", "选择器", "上传", "滑块"]
+PROPS = [
+    ("disabled", "boolean", "false", "是否禁用", "Whether disabled", None),
+    ("size", "string", "middle", "尺寸", "Size", ["large", "middle", "small"]),
+    ("onChange", "function", "-", "变化时的回调", "Callback when changed", None),
+    ("className", "string", "-", "自定义类名", "Custom class name", None),
+    ("style", "CSSProperties", "-", "自定义样式", "Custom style", None),
+    ("loading", "boolean", "false", "是否加载中", "Whether loading", None),
+    ("placement", "string", "top", "弹出位置", "Popup placement", ["top", "bottom", "left", "right"]),
+    ("value", "string", "-", "当前值", "Current value", None),
+]
+
+
+def synthetic_catalog(size: int, seed: int = 42) -> Dict[str, Any]:
+    """生成 size 个组件的嵌套目录，结构与真实目录一致"""
+    rng = random.Random(seed)
+    categories = {key: {"title": f"{key} 组件 {key.title()} Components", "components": []} for key in CATEGORIES}
+    for i in range(size):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        en = f"{rng.choice(WORDS).title()}{rng.choice(WORDS).title()} {i}"
+        zh = f"{rng.choice(ZH_WORDS)}{rng.choice(ZH_WORDS)}{i}"
+        props = []
+        for name, type_, default, desc_zh, desc_en, options in rng.sample(PROPS, rng.randint(3, 7)):
+            prop = {"name": name, "type": type_, "default": default, "description": {"zh": desc_zh, "en": desc_en}}
+            if options:
+                prop["options"] = options
+            props.append(prop)
+        categories[category]["components"].append({
+            "id": f"component-{i}",
+            "name": {"zh": zh, "en": en},
+            "description": {"zh": f"用于展示{zh}的组件", "en": f"Component for displaying {en.lower()}"},
+            "category": category,
+            "props": props,
+            "codeExample": f"<{en.split()[0]} size=\"middle\" />",
+        })
+    return categories
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """进程及其子进程（uvicorn worker）的 RSS 之和，单位 MB；非 Linux 返回 None"""
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            if current == pid:
+                return None
+    return total / 1024
+
+
+async def run_load(
+    client: httpx.AsyncClient, paths: List[str], requests: int, concurrency: int, accept_encoding: str
+) -> Dict[str, Any]:
+    """用 concurrency 个协程一共发 requests 个请求，返回统计结果"""
+    latencies: List[float] = []
+    received = 0
+    errors = 0
+    remaining = requests
+    headers = {"Accept-Encoding": accept_encoding}
+
+    async def worker(worker_id: int) -> None:
+        nonlocal remaining, received, errors
+        rng = random.Random(worker_id)
+        while remaining > 0:
+            remaining -= 1
+            path = rng.choice(paths)
+            start = time.perf_counter()
+            # 只读原始字节，不在客户端解压，避免客户端成为瓶颈
+            async with client.stream("GET", path, headers=headers) as response:
+                async for chunk in response.aiter_raw():
+                    received += len(chunk)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "avg_bytes": received // max(1, len(latencies)),
+    }
+
+
+def endpoint_paths(endpoint: str, ids: List[str]) -> List[str]:
+    if endpoint == "components":
+        return ["/api/components"]
+    if endpoint == "component":
+        return [f"/api/components/{component_id}" for component_id in ids]
+    if endpoint == "categories":
+        return ["/api/categories"]
+    raise ValueError(f"未知的接口: {endpoint}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def bench_inprocess(catalog_path: str, ids: List[str], args: argparse.Namespace) -> List[Dict[str, Any]]:
+    os.environ["COMPONENTS_CATALOG"] = catalog_path
+    os.environ["CATALOG_WATCH_INTERVAL"] = "0"
+    import catalog
+    import main
+
+    started = time.perf_counter()
+    catalog.load_catalog(catalog_path)
+    load_seconds = time.perf_counter() - started
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in args.endpoints:
+            stats = await run_load(client, endpoint_paths(endpoint, ids), args.requests, args.concurrency, args.accept_encoding)
+            stats.update(endpoint=endpoint, load_seconds=round(load_seconds, 3), rss_mb=rss_mb(os.getpid()))
+            results.append(stats)
+    return results
+
+
+async def bench_uvicorn(catalog_path: str, ids: List[str], args: argparse.Namespace) -> List[Dict[str, Any]]:
+    port = free_port()
+    env = dict(os.environ, COMPONENTS_CATALOG=catalog_path, CATALOG_WATCH_INTERVAL="0")
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    results = []
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+            # 等服务启动（包括建索引）完成
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn 启动失败")
+                try:
+                    if (await client.get("/api/categories")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            load_seconds = time.perf_counter() - started
+
+            for endpoint in args.endpoints:
+                stats = await run_load(client, endpoint_paths(endpoint, ids), args.requests, args.concurrency, args.accept_encoding)
+                stats.update(endpoint=endpoint, load_seconds=round(load_seconds, 3), rss_mb=rss_mb(server.pid))
+                results.append(stats)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    columns = ["size", "endpoint", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "avg_bytes", "rss_mb", "load_seconds"]
+    print("  ".join(f"{column:>12}" for column in columns))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column)
+            if isinstance(value, float):
+                value = f"{value:.1f}" if column == "rss_mb" else value
+            cells.append(f"{str(value):>12}")
+        print("  ".join(cells))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="组件 API 压测")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--sizes", default="100,10000,100000", help="逗号分隔的目录规模")
+    parser.add_argument("--endpoints", default="components,component,categories", help="逗号分隔：components,component,categories")
+    parser.add_argument("--requests", type=int, default=2000, help="每个接口的请求数")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn 模式下的 worker 数")
+    parser.add_argument("--accept-encoding", default="br, gzip", help="请求的 Accept-Encoding，identity 表示不压缩")
+    parser.add_argument("--json", help="把结果写到这个 JSON 文件，便于比较前后两次的结果")
+    args = parser.parse_args()
+    args.endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            catalog_path = os.path.join(tmp, f"components-{size}.jsonl")
+            storage.write_catalog(catalog_path, synthetic_catalog(size))
+            ids = [f"component-{i}" for i in range(size)]
+            bench = bench_inprocess if args.mode == "inprocess" else bench_uvicorn
+            for stats in asyncio.run(bench(catalog_path, ids, args)):
+                stats["size"] = size
+                rows.append(stats)
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"mode": args.mode, "concurrency": args.concurrency, "workers": args.workers, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
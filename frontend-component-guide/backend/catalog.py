@@ -0,0 +1,337 @@
+"""
+组件目录索引
+
+启动时扫描目录文件（见 storage.py），建成 id / 分类 / 名称 三套索引，
+请求里直接查字典，不再对每个分类、每个组件做嵌套遍历。索引里只保存组件在
+文件中的记录号，组件本身用到时才从映射的文件中解码成紧凑的 Component 记录
+（见 models.py），最近用过的记录放在一个有上限的 LRU 缓存里。目录重新加载时整体重建
+一份新索引，再用一次引用赋值替换旧索引。处理请求时只取一次 current()，
+整个请求都使用同一份快照，重建期间也不会阻塞请求。
+
+/api/components 的完整响应体也在建索引时一并序列化好，随索引一起替换，
+所以只有目录变化时才会重新生成。单个组件的响应体在请求时从映射的文件中
+切出来，最近请求过的（连同请求过的压缩版本）放在一个有上限的 LRU 缓存里，
+worker 的内存不会随着被请求过的组件数增长。
+
+分页按目录原有顺序进行，游标是上一页最后一个组件 id 的 base64 编码，
+用 id -> 位置 的索引定位，不需要从头扫描。
+"""
+import base64
+import binascii
+import gc
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache, partial
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from http_cache import CachedBody, dump_json
+from models import Component, Prop
+from search import SearchIndex
+from storage import CatalogStore, file_signature, remove_snapshots
+
+logger = logging.getLogger(__name__)
+
+# 每个索引最多缓存多少个解码后的组件
+RECORD_CACHE_SIZE = 4096
+# 每个索引最多缓存多少个单个组件的响应
+BODY_CACHE_SIZE = 4096
+
+# 可以通过 fields= 投影的组件字段
+COMPONENT_FIELDS = ("id", "name", "description", "category", "props", "codeExample")
+
+
+def encode_cursor(component_id: str) -> str:
+    return base64.urlsafe_b64encode(component_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """解码分页游标，格式不对时抛出 ValueError"""
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("无效的分页游标") from e
+
+
+def _catalog_parts(
+    store: CatalogStore, by_id: Dict[str, int], by_category: Dict[str, Tuple[str, ...]]
+) -> Iterator[bytes]:
+    """依次给出完整目录响应体的各个片段，直接使用文件中各组件的原始 JSON，不需要解码"""
+    raw = store.raw
+    yield b'{"categories":{'
+    for i, (key, ids) in enumerate(by_category.items()):
+        if i:
+            yield b","
+        yield dump_json(key) + b':{"title":' + dump_json(store.titles[key]) + b',"components":['
+        for j, component_id in enumerate(ids):
+            if j:
+                yield b","
+            yield raw(by_id[component_id])
+        yield b"]}"
+    yield b'},"allComponents":['
+    for j, component_id in enumerate(chain.from_iterable(by_category.values())):
+        if j:
+            yield b","
+        yield raw(by_id[component_id])
+    yield b"]}"
+
+
+def _decode(store: CatalogStore, record: int) -> Component:
+    return Component.from_dict(store.component(record))
+
+
+class ComponentIndex:
+    """组件目录的只读索引，创建后不再修改"""
+
+    __slots__ = (
+        "store", "titles", "by_id", "by_category", "by_name", "all_ids", "positions", "search_index",
+        "loaded_at", "components_body", "categories_body", "_component_bodies", "_records",
+    )
+
+    def __init__(self, store: CatalogStore, loaded_at: Optional[float] = None):
+        by_id: Dict[str, int] = {}
+        category_ids: Dict[str, List[str]] = {key: [] for key in store.titles}
+        by_name: Dict[str, str] = {}
+        # 校验时解码出的属性在建索引期间保留，相同的属性只创建一次
+        props: Set[Prop] = set()
+
+        def scan() -> Iterator[Dict[str, Any]]:
+            # 逐个解码组件建索引，同时交给搜索索引，解码结果用完即丢
+            for record, component in enumerate(store):
+                # 先按请求时的方式解码一遍，格式不对的文件在替换当前索引之前就被拒绝，
+                # 而不是等到请求这个组件时才返回 500
+                try:
+                    props.update(Component.from_dict(component).props)
+                except (KeyError, TypeError, AttributeError) as e:
+                    raise ValueError(f"第 {record + 1} 个组件格式不正确: {e!r}") from e
+                component_id = component["id"]
+                # id 重复时以第一个为准
+                if component_id in by_id:
+                    continue
+                ids = category_ids.get(component["category"])
+                if ids is None:
+                    raise ValueError(f"组件 {component_id} 的分类 {component['category']} 不在文件头中")
+                by_id[component_id] = record
+                ids.append(component_id)
+                for name in component["name"].values():
+                    by_name.setdefault(name.lower(), component_id)
+                yield component
+
+        # 全文搜索的倒排索引
+        self.search_index = SearchIndex(scan())
+
+        self.store = store
+        # 分类 -> 标题
+        self.titles = store.titles
+        # id -> 组件在目录文件中的记录号
+        self.by_id = by_id
+        # 分类 -> 组件 id 元组（保持原有顺序）
+        self.by_category = {key: tuple(ids) for key, ids in category_ids.items()}
+        # 小写的中/英文名称 -> 组件 id
+        self.by_name = by_name
+        # 全部组件 id（按分类依次排列）及其位置，同一分类的组件在其中是连续的
+        self.all_ids = tuple(chain.from_iterable(self.by_category.values()))
+        self.positions = {component_id: i for i, component_id in enumerate(self.all_ids)}
+        # 作为各响应的 Last-Modified
+        self.loaded_at = store.mtime if loaded_at is None else loaded_at
+        # /api/components 的完整响应；目录很大时不保留未压缩版本，需要时从映射的文件
+        # 重新拼接。rebuild 不引用 self，旧索引替换后可以立即回收
+        catalog_parts = partial(_catalog_parts, store, by_id, self.by_category)
+        self.components_body = CachedBody(b"".join(catalog_parts()), self.loaded_at, rebuild=catalog_parts)
+        # /api/categories 的响应
+        self.categories_body = CachedBody.from_content(list(self.by_category), self.loaded_at)
+        # 组件 id -> 单个组件的响应，按最近使用排序
+        self._component_bodies: "OrderedDict[str, CachedBody]" = OrderedDict()
+        # 最近解码过的组件（紧凑的 Component 记录）；同样不引用 self，索引里没有循环引用
+        self._records = lru_cache(maxsize=RECORD_CACHE_SIZE)(partial(_decode, store))
+
+    def get(self, component_id: str) -> Optional[Component]:
+        """按 id 查找组件，找不到返回 None"""
+        record = self.by_id.get(component_id)
+        if record is None:
+            return None
+        return self._records(record)
+
+    def component_body(self, component_id: str) -> Optional[CachedBody]:
+        """返回单个组件序列化好的响应，组件不存在时返回 None"""
+        bodies = self._component_bodies
+        cached = bodies.get(component_id)
+        if cached is not None:
+            bodies.move_to_end(component_id)
+            return cached
+        record = self.by_id.get(component_id)
+        if record is None:
+            return None
+        # 文件中的一行就是响应体；只在事件循环线程里调用，不需要加锁。大目录里多数请求
+        # 都不命中，不用最高级别预压缩所有编码，只压缩请求的那一种
+        cached = bodies[component_id] = CachedBody(self.store.raw(record), self.loaded_at, lazy=True)
+        if len(bodies) > BODY_CACHE_SIZE:
+            bodies.popitem(last=False)
+        return cached
+
+    def is_body_cached(self, component_id: str) -> bool:
+        """单个组件的响应是否已经生成过（用于统计缓存命中率）"""
+        return component_id in self._component_bodies
+
+    def batch_json(self, component_ids: Iterable[str]) -> bytes:
+        """
+        批量取组件，直接拼接原始 JSON 得到 {"items": [...], "missing": [...]}
+        重复的 id 只返回一次
+        """
+        by_id = self.by_id
+        raw = self.store.raw
+        found = []
+        missing = []
+        for component_id in dict.fromkeys(component_ids):
+            record = by_id.get(component_id)
+            if record is None:
+                missing.append(component_id)
+            else:
+                found.append(raw(record))
+        return b'{"items":[' + b",".join(found) + b'],"missing":' + dump_json(missing) + b"}"
+
+    def page_ids(
+        self, category: Optional[str], after_id: Optional[str], limit: int
+    ) -> Tuple[Tuple[str, ...], bool]:
+        """
+        按目录顺序取一页组件 id，返回 (id 元组, 是否还有下一页)
+        分类不存在时抛出 KeyError，游标指向的组件不在该范围内时抛出 ValueError
+        """
+        ids = self.all_ids if category is None else self.by_category[category]
+        start = 0
+        if after_id is not None:
+            position = self.positions.get(after_id)
+            # 分类内的组件是连续的，用首个组件的位置换算出分类内偏移
+            offset = self.positions[ids[0]] if ids else 0
+            if position is None or not offset <= position < offset + len(ids):
+                raise ValueError("无效的分页游标")
+            start = position - offset + 1
+        end = start + limit
+        return ids[start:end], end < len(ids)
+
+    def page(
+        self, category: Optional[str], after_id: Optional[str], limit: int
+    ) -> Tuple[List[Component], bool]:
+        """按目录顺序取一页组件，返回 (组件列表, 是否还有下一页)，异常同 page_ids"""
+        ids, has_more = self.page_ids(category, after_id, limit)
+        by_id = self.by_id
+        records = self._records
+        return [records(by_id[component_id]) for component_id in ids], has_more
+
+    def page_json(self, category: Optional[str], after_id: Optional[str], limit: int) -> bytes:
+        """
+        一页完整组件的响应体 {"items": [...], "nextCursor": ..., "total": ...}
+        直接拼接文件中的原始 JSON，不需要解码；异常同 page_ids
+        """
+        ids, has_more = self.page_ids(category, after_id, limit)
+        by_id = self.by_id
+        raw = self.store.raw
+        next_cursor = encode_cursor(ids[-1]) if has_more else None
+        total = len(self.by_category[category]) if category is not None else len(self)
+        return (
+            b'{"items":[' + b",".join(raw(by_id[component_id]) for component_id in ids)
+            + b'],"nextCursor":' + dump_json(next_cursor) + b',"total":' + dump_json(total) + b"}"
+        )
+
+    def find_by_name(self, name: str) -> Optional[Component]:
+        """按中文或英文名称查找组件（不区分大小写）"""
+        component_id = self.by_name.get(name.lower())
+        if component_id is None:
+            return None
+        return self.get(component_id)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+
+_current: Optional[ComponentIndex] = None
+_path: Optional[str] = None
+_snapshot_dir: Optional[str] = None
+# 同一时间只做一次重建，避免文件监视和管理接口同时触发时重复建索引
+_reload_lock = threading.Lock()
+
+
+def load_catalog(path: str, snapshot_dir: Optional[str] = None) -> ComponentIndex:
+    """
+    从目录文件重建索引并替换当前索引
+    指定 snapshot_dir 时映射的是目录文件的只读快照，编辑中的目录文件不会影响服务
+    """
+    global _current, _path, _snapshot_dir
+    with _reload_lock:
+        # 建索引会创建几百万个对象，期间触发的完整回收每次都要遍历全部对象并一直持有 GIL，
+        # 事件循环会停顿上百毫秒；建索引时暂停自动回收
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            index = ComponentIndex(CatalogStore(path, snapshot_dir))
+            # 先建好再整体替换，读者要么拿到旧索引，要么拿到新索引；
+            # 旧索引（连同它映射的旧文件）在最后一个请求用完后才被回收
+            _current = index
+            _path = path
+            _snapshot_dir = snapshot_dir
+        finally:
+            if gc_enabled:
+                gc.enable()
+        # 索引只读且没有循环引用，冻结后以后的回收不再遍历它，旧索引靠引用计数照常释放
+        gc.freeze()
+        if snapshot_dir is not None:
+            remove_snapshots(path, snapshot_dir, keep=index.store)
+    logger.info("组件目录已加载: %s，共 %d 个组件", path, len(index))
+    return index
+
+
+def reload_catalog(force: bool = False) -> bool:
+    """
+    目录文件有变化时重新加载，返回是否真的重新加载了
+    这是一个阻塞调用，应放在后台线程中执行，不要在事件循环里直接调用
+    """
+    if _path is None:
+        raise RuntimeError("组件目录尚未加载")
+    if not force and disk_signature() in (None, current().store.signature):
+        return False
+    load_catalog(_path, _snapshot_dir)
+    return True
+
+
+def disk_signature() -> Optional[Tuple[int, int, int]]:
+    """磁盘上目录文件当前的签名，文件不存在时返回 None"""
+    try:
+        return file_signature(os.stat(_path))
+    except (OSError, TypeError):
+        return None
+
+
+def current() -> ComponentIndex:
+    """返回当前生效的索引"""
+    if _current is None:
+        raise RuntimeError("组件目录尚未加载")
+    return _current
+
+
+class CatalogWatcher(threading.Thread):
+    """定期检查目录文件，发现变化后在本线程内重建索引并替换"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="catalog-watcher", daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        failed = None
+        while not self._stopped.wait(self.interval):
+            signature = disk_signature()
+            # 同一个有问题的文件只尝试一次，等它再次被修改
+            if signature is None or signature == failed:
+                continue
+            try:
+                reload_catalog()
+                failed = None
+            except Exception:
+                # 新文件有问题时继续使用旧目录
+                failed = signature
+                logger.exception("重新加载组件目录失败，继续使用旧目录")
+
+    def stop(self) -> None:
+        self._stopped.set()
@@ -0,0 +1,158 @@
+"""
+响应压缩
+
+按 Accept-Encoding 在 br / zstd / gzip 中协商编码：
+- 不变的响应（目录、分类）由 http_cache.CachedBody 在生成时用最高压缩级别
+  预先压缩好，之后每次请求直接挑一个版本返回；单个组件数量太多，第一次请求
+  某种编码时才用较快的级别压缩并缓存
+- 其他动态响应由 CompressionMiddleware 在返回时用较快的级别压缩
+小于 MIN_SIZE 的响应压缩收益很小，直接原样返回。
+
+brotli 和 zstandard 都是可选依赖，没有安装时对应编码不参与协商。
+"""
+import gzip
+from typing import Dict, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 小于这个字节数的响应不压缩
+MIN_SIZE = 1024
+# 值得压缩的内容类型前缀
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+# 服务端偏好顺序，客户端 q 值相同时按这个顺序选
+ENCODINGS = tuple(
+    encoding for encoding, module in (("br", brotli), ("zstd", zstandard), ("gzip", gzip))
+    if module is not None
+)
+
+# 预压缩（只做一次）和动态压缩（每个请求都做）使用的压缩级别；
+# 最高级别的 brotli / zstd 很慢，大目录在重新加载时会明显变慢，超过
+# LARGE_SIZE 的响应体预压缩时退到稍低一些的级别
+STATIC_LEVELS = {"br": 11, "zstd": 19, "gzip": 9}
+LARGE_STATIC_LEVELS = {"br": 9, "zstd": 12, "gzip": 9}
+DYNAMIC_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+LARGE_SIZE = 1024 * 1024
+
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    if not static:
+        level = DYNAMIC_LEVELS[encoding]
+    elif len(body) > LARGE_SIZE:
+        level = LARGE_STATIC_LEVELS[encoding]
+    else:
+        level = STATIC_LEVELS[encoding]
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def precompress(body: bytes) -> Dict[str, bytes]:
+    """用最高级别把 body 压缩成所有支持的编码，太小的 body 返回空字典"""
+    if len(body) < MIN_SIZE:
+        return {}
+    return {encoding: compress(body, encoding, static=True) for encoding in ENCODINGS}
+
+
+def negotiate(accept_encoding: Optional[str], offered: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """
+    从 offered 中选出客户端最想要的编码，都不接受时返回 None（即不压缩）
+    q 值高者优先，q 值相同时按 offered 的顺序
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[coding] = q
+
+    best = None
+    best_q = 0.0
+    for encoding in offered:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    压缩一次性发送完的动态响应
+    已经带 Content-Encoding 的（预压缩的响应）、流式的、太小的、不适合压缩的类型都原样返回
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        if not accept_encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        streaming = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, streaming
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or streaming:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if message.get("more_body", False):
+                # 流式响应不做处理
+                streaming = True
+            elif (
+                len(body) >= self.minimum_size
+                and "content-encoding" not in headers
+                and is_compressible(headers.get("content-type"))
+            ):
+                encoding = negotiate(accept_encoding)
+                if encoding is not None:
+                    body = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    if "accept-encoding" not in headers.get("vary", "").lower():
+                        headers.add_vary_header("Accept-Encoding")
+                    message = {**message, "body": body}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
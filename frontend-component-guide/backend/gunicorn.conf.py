@@ -0,0 +1,68 @@
+"""
+生产环境启动配置（gunicorn + uvicorn worker）
+
+    cd backend
+    gunicorn -c gunicorn.conf.py
+
+- master 进程监听端口，worker 共享同一个 socket
+- preload_app：master 先导入 main（加载目录、建好索引和预压缩的响应体）再 fork，
+  worker 以写时复制的方式共享这些数据，启动也不用每个 worker 各建一遍索引；
+  之后每次 fork 新 worker（HUP、max_requests 重启）前 master 都检查目录文件，
+  有变化就先在 master 里重建，新 worker 继承的是最新的目录
+- 每个 worker 处理 max_requests（加上随机抖动）个请求后重启，防止内存慢慢上涨
+- kill -HUP <master pid>：逐个启动新 worker、优雅停止旧 worker，端口不断开；
+  更新了代码时用 kill -USR2 <master pid> 启动新的 master，确认正常后对旧 master 发
+  kill -QUIT（preload_app 下 HUP 不会重新导入代码）
+
+以下配置都可以用环境变量覆盖。
+"""
+import gc
+import multiprocessing
+import os
+
+wsgi_app = "main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+# 异步 worker 每个进程就能处理大量并发连接，数量和 CPU 核数相同即可
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+backlog = int(os.environ.get("BACKLOG", "2048"))
+
+preload_app = True
+
+max_requests = int(os.environ.get("MAX_REQUESTS", "10000"))
+# 避免所有 worker 同时重启
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "1000"))
+
+# 优雅停止时等正在处理的请求结束的最长时间
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("TIMEOUT", "60"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+
+accesslog = os.environ.get("ACCESS_LOG")
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+
+# 上次在 master 里加载失败的目录文件签名，同一个有问题的文件不在每次 fork 时都重试
+# （HUP 会重新执行本文件，相当于手动再试一次）
+_failed_signature = None
+
+
+def pre_fork(server, worker):
+    global _failed_signature
+    # master 不运行 CatalogWatcher，目录文件更新后只有 worker 各自重建索引；fork 前在
+    # master 里重建一次，新 worker 不会继承旧索引，也不用每个再建一遍、失去共享的内存
+    import catalog
+
+    signature = catalog.disk_signature()
+    if signature is not None and signature != _failed_signature:
+        try:
+            catalog.reload_catalog()
+            _failed_signature = None
+        except Exception:
+            _failed_signature = signature
+            server.log.exception("master 重新加载组件目录失败，新 worker 继续使用旧目录")
+    # 把预加载阶段创建的对象移出垃圾回收的跟踪范围，worker 里的 GC 不会去改这些对象的
+    # 头部，共享的内存页就不会因为 GC 被复制
+    gc.freeze()
@@ -0,0 +1,167 @@
+"""
+预序列化响应
+
+目录数据是静态的，响应体只需要在目录加载时序列化一次。这里把序列化后的
+字节、ETag 以及各种编码的预压缩版本（见 compression.py）放在一起缓存，请求时
+按 Accept-Encoding 直接挑一个返回，不再经过 pydantic 校验、JSON 编码和压缩。
+数量很多、各自很少被请求的响应（单个组件）不预压缩，第一次请求某种编码时
+才用动态级别压缩这一种并保存下来。
+
+每个响应都带 ETag / Last-Modified 和 Cache-Control，客户端带着
+If-None-Match 或 If-Modified-Since 来重新验证时，内容没变就直接回 304。
+"""
+import gzip
+import hashlib
+import json
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from compression import ENCODINGS, LARGE_SIZE, MIN_SIZE, compress, negotiate, precompress
+
+# 浏览器缓存 60 秒后带校验头重新验证；CDN 等共享缓存可以缓存 5 分钟，
+# 过期后 10 分钟内允许先返回旧内容、后台再去源站重新验证
+CACHE_CONTROL = "public, max-age=60, s-maxage=300, stale-while-revalidate=600"
+# 分块发送未压缩的大响应时每块的字节数
+CHUNK_SIZE = 256 * 1024
+
+
+def dump_json(content: Any) -> bytes:
+    """与 FastAPI 默认 JSONResponse 相同的序列化方式"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class CachedBody:
+    """一份序列化好的响应体及其压缩版本"""
+
+    __slots__ = ("_body", "_rebuild", "_lazy", "size", "etag", "last_modified", "modified_at", "encoded")
+
+    def __init__(
+        self,
+        body: bytes,
+        modified_at: float,
+        compress: bool = True,
+        rebuild: Optional[Callable[[], Iterable[bytes]]] = None,
+        lazy: bool = False,
+    ):
+        # 各压缩版本内容等价，统一使用弱 ETag
+        self.etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        # HTTP 日期只精确到秒
+        self.modified_at = int(modified_at)
+        self.last_modified = formatdate(self.modified_at, usegmt=True)
+        # 编码 -> 预压缩的响应体；只用一次的响应（例如分页结果）不值得花 CPU
+        # 用最高级别预先压缩，交给 CompressionMiddleware 按需压缩；lazy 时先不压缩，
+        # 见 encode()
+        self.encoded = precompress(body) if compress and not lazy else {}
+        self._lazy = compress and lazy and len(body) >= MIN_SIZE
+        # 很大的响应（例如 10 万组件的完整目录）只保留压缩版本，省下每个 worker
+        # 上百 MB 的内存；极少数不接受压缩的客户端请求时用 rebuild 分块重新生成
+        # （例如从映射的文件中切出来），没有 rebuild 时临时解压
+        self.size = len(body)
+        large = self.size > LARGE_SIZE and (rebuild is not None or "gzip" in self.encoded)
+        self._body = None if large else body
+        self._rebuild = rebuild
+
+    @property
+    def is_stored(self) -> bool:
+        """是否保留了未压缩的响应体"""
+        return self._body is not None
+
+    @property
+    def body(self) -> bytes:
+        """未压缩的响应体；没有保留时每次都要重新生成，应尽量用 chunks()"""
+        if self._body is not None:
+            return self._body
+        return b"".join(self.chunks())
+
+    def chunks(self) -> Iterator[bytes]:
+        """分块给出未压缩的响应体"""
+        if self._body is not None:
+            yield self._body
+        elif self._rebuild is not None:
+            buffer: List[bytes] = []
+            size = 0
+            for part in self._rebuild():
+                buffer.append(part)
+                size += len(part)
+                if size >= CHUNK_SIZE:
+                    yield b"".join(buffer)
+                    buffer = []
+                    size = 0
+            if buffer:
+                yield b"".join(buffer)
+        else:
+            yield gzip.decompress(self.encoded["gzip"])
+
+    @property
+    def offered(self) -> Iterable[str]:
+        """可以提供的编码"""
+        return ENCODINGS if self._lazy else self.encoded
+
+    def encode(self, encoding: str) -> bytes:
+        """encoding 编码的响应体，lazy 时第一次请求才用动态级别压缩"""
+        data = self.encoded.get(encoding)
+        if data is None:
+            data = self.encoded[encoding] = compress(self.body, encoding)
+        return data
+
+    @classmethod
+    def from_content(cls, content: Any, modified_at: float, compress: bool = True) -> "CachedBody":
+        return cls(dump_json(content), modified_at, compress)
+
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, cached: CachedBody) -> bool:
+    """判断条件请求是否可以返回 304"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # 有 If-None-Match 时忽略 If-Modified-Since，ETag 按弱比较
+        if if_none_match.strip() == "*":
+            return True
+        etag = _strip_weak(cached.etag)
+        return any(_strip_weak(tag.strip()) == etag for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return cached.modified_at <= since
+    return False
+
+
+def cached_response(
+    request: Request, cached: CachedBody, media_type: str = "application/json"
+) -> Response:
+    """按客户端支持的编码返回预先序列化好的响应，内容未变化时返回 304"""
+    headers = {
+        "ETag": cached.etag,
+        "Last-Modified": cached.last_modified,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(request, cached):
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate(request.headers.get("accept-encoding"), cached.offered)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        return Response(content=cached.encode(encoding), media_type=media_type, headers=headers)
+    if cached.is_stored:
+        return Response(content=cached.body, media_type=media_type, headers=headers)
+    # 没有保留未压缩版本的大响应边生成边发送；同步迭代器由 Starlette 放到线程池里
+    # 执行，不占用事件循环
+    headers["Content-Length"] = str(cached.size)
+    return StreamingResponse(cached.chunks(), media_type=media_type, headers=headers)
@@ -0,0 +1,153 @@
+"""
+接口指标
+
+MetricsMiddleware 按路由（处理函数名，例如 get_components）记录：
+- 请求数（按状态码）
+- 延迟直方图
+- 响应字节数（压缩后，即实际发送的字节）及其直方图
+- 缓存命中 / 未命中次数：处理函数通过 mark_cache() 标记这次响应是否直接复用了
+  已经序列化好的响应体
+
+/metrics 以 Prometheus 文本格式输出。所有处理函数都跑在同一个事件循环线程上，
+计数器就是预先分配好的整数列表，记录一次只是几次加法和一次二分查找，不需要加锁。
+每个 worker 进程各自统计，多 worker 时由 Prometheus 分别抓取后汇总。
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, List
+
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# 响应大小直方图的桶上界（字节）
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class RouteMetrics:
+    """一个路由的所有计数器，桶在创建时一次性分配好"""
+
+    __slots__ = (
+        "statuses", "latency_buckets", "latency_sum", "size_buckets", "bytes_total",
+        "cache_hits", "cache_misses",
+    )
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        # 最后一个桶对应 +Inf
+        self.latency_buckets: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.size_buckets: List[int] = [0] * (len(SIZE_BUCKETS) + 1)
+        self.bytes_total = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def observe(self, status: int, seconds: float, size: int) -> None:
+        statuses = self.statuses
+        statuses[status] = statuses.get(status, 0) + 1
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+        self.size_buckets[bisect_left(SIZE_BUCKETS, size)] += 1
+        self.bytes_total += size
+
+
+# 路由名 -> 计数器
+routes: Dict[str, RouteMetrics] = {}
+
+
+def _route_metrics(route: str) -> RouteMetrics:
+    metrics = routes.get(route)
+    if metrics is None:
+        metrics = routes[route] = RouteMetrics()
+    return metrics
+
+
+def mark_cache(request: Request, hit: bool) -> None:
+    """在处理函数中标记本次响应是否命中了服务端缓存"""
+    request.state.cache_hit = hit
+
+
+class MetricsMiddleware:
+    """记录每个请求的延迟、状态码、响应大小和缓存命中情况"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_and_count(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_count)
+        finally:
+            # 路由匹配后 Starlette 会把处理函数写进 scope；没匹配上的请求归到一起，
+            # 避免随意的 URL 产生无数个标签
+            endpoint = scope.get("endpoint")
+            route = getattr(endpoint, "__name__", "unmatched")
+            metrics = _route_metrics(route)
+            metrics.observe(status, time.perf_counter() - start, size)
+            cache_hit = scope.get("state", {}).get("cache_hit")
+            if cache_hit is True:
+                metrics.cache_hits += 1
+            elif cache_hit is False:
+                metrics.cache_misses += 1
+
+
+def _histogram(lines: List[str], name: str, route: str, bounds, buckets: List[int], total) -> None:
+    cumulative = 0
+    for bound, count in zip(bounds, buckets):
+        cumulative += count
+        lines.append(f'{name}_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+    cumulative += buckets[-1]
+    lines.append(f'{name}_bucket{{route="{route}",le="+Inf"}} {cumulative}')
+    lines.append(f'{name}_sum{{route="{route}"}} {total}')
+    lines.append(f'{name}_count{{route="{route}"}} {cumulative}')
+
+
+def render() -> str:
+    """Prometheus 文本格式"""
+    # 先拍一份快照，避免输出过程中有新路由加入
+    snapshot = sorted(routes.items())
+    lines = [
+        "# HELP component_api_requests_total 请求数",
+        "# TYPE component_api_requests_total counter",
+    ]
+    for route, metrics in snapshot:
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(f'component_api_requests_total{{route="{route}",status="{status}"}} {count}')
+
+    lines.append("# HELP component_api_request_duration_seconds 请求处理时间")
+    lines.append("# TYPE component_api_request_duration_seconds histogram")
+    for route, metrics in snapshot:
+        _histogram(lines, "component_api_request_duration_seconds", route,
+                   LATENCY_BUCKETS, metrics.latency_buckets, metrics.latency_sum)
+
+    lines.append("# HELP component_api_response_size_bytes 响应体大小（压缩后）")
+    lines.append("# TYPE component_api_response_size_bytes histogram")
+    for route, metrics in snapshot:
+        _histogram(lines, "component_api_response_size_bytes", route,
+                   SIZE_BUCKETS, metrics.size_buckets, metrics.bytes_total)
+
+    lines.append("# HELP component_api_cache_requests_total 服务端响应缓存命中 / 未命中次数")
+    lines.append("# TYPE component_api_cache_requests_total counter")
+    for route, metrics in snapshot:
+        if metrics.cache_hits or metrics.cache_misses:
+            lines.append(f'component_api_cache_requests_total{{route="{route}",result="hit"}} {metrics.cache_hits}')
+            lines.append(f'component_api_cache_requests_total{{route="{route}",result="miss"}} {metrics.cache_misses}')
+    return "\n".join(lines) + "\n"
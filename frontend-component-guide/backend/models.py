@@ -0,0 +1,152 @@
+"""
+组件数据的紧凑表示
+
+从目录文件解码出来的组件不再保存成一层套一层的字典，而是用 __slots__ 记录：
+- 每个对象没有 __dict__，也不用为每个组件重复保存 "name" / "type" 这些键
+- 属性名、类型、默认值等字符串做 intern，同样的字符串只存一份
+- 完全相同的属性（例如各组件都有的 disabled / onChange）共用同一个 Prop 对象，
+  可选值 options 共用同一个元组；默认值或可选值是列表、对象等其他 JSON 值时
+  按 JSON 文本判断是否相同
+
+to_dict() 还原出的结构与目录文件中的 JSON 完全一致（键的顺序也一致），
+序列化结果不变。名称和描述只保留 zh / en 两种语言。
+"""
+import json
+import sys
+import weakref
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# 相同的可选值列表共用一个元组；不同的 options 组合很少，不做淘汰
+_shared_options: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+# 相同的属性共用一个 Prop，没有组件再引用时自动释放
+_shared_props: "weakref.WeakValueDictionary[Any, Prop]" = weakref.WeakValueDictionary()
+# 可以直接放进共享键的默认值类型；按类型精确匹配，否则 1 和 True 会被当成同一个值
+_SCALAR_TYPES = (str, bool, int, type(None))
+
+
+def _intern(value: Any) -> Any:
+    # 默认值等字段在 JSON 里偶尔不是字符串
+    return sys.intern(value) if type(value) is str else value
+
+
+class Text:
+    """中英文文本"""
+
+    __slots__ = ("zh", "en", "__weakref__")
+
+    def __init__(self, zh: str, en: str):
+        self.zh = zh
+        self.en = en
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, str], intern: bool = False) -> "Text":
+        if intern:
+            return cls(_intern(data["zh"]), _intern(data["en"]))
+        return cls(data["zh"], data["en"])
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"zh": self.zh, "en": self.en}
+
+
+class Prop:
+    """组件属性，创建后不再修改，可以在组件之间共享"""
+
+    __slots__ = ("name", "type", "default", "description", "options", "__weakref__")
+
+    def __init__(self, name: str, type: str, default: Any, description: Text, options: Optional[Tuple[Any, ...]]):
+        self.name = name
+        self.type = type
+        self.default = default
+        self.description = description
+        self.options = options
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Prop":
+        description = data["description"]
+        default = data["default"]
+        options = data.get("options")
+        if options is not None:
+            options = tuple(options)
+        plain = type(default) in _SCALAR_TYPES and (
+            options is None or all(type(option) is str for option in options)
+        )
+        if plain:
+            key: Any = (
+                data["name"], data["type"], type(default), default, description["zh"], description["en"], options,
+            )
+        else:
+            # 列表、对象不能作为字典的键，用 JSON 文本判断属性是否完全相同
+            key = json.dumps(data, ensure_ascii=False)
+        prop = _shared_props.get(key)
+        if prop is None:
+            if plain and options is not None:
+                options = _shared_options.setdefault(options, tuple(_intern(option) for option in options))
+            prop = cls(
+                _intern(data["name"]),
+                _intern(data["type"]),
+                _intern(default),
+                Text.from_dict(description, intern=True),
+                options,
+            )
+            _shared_props[key] = prop
+        return prop
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "name": self.name,
+            "type": self.type,
+            "default": self.default,
+            "description": self.description.to_dict(),
+        }
+        if self.options is not None:
+            data["options"] = list(self.options)
+        return data
+
+
+class Component:
+    """一个组件"""
+
+    __slots__ = ("id", "name", "description", "category", "props", "code_example")
+
+    def __init__(
+        self, id: str, name: Text, description: Text, category: str,
+        props: Tuple[Prop, ...], code_example: str,
+    ):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.category = category
+        self.props = props
+        self.code_example = code_example
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Component":
+        return cls(
+            data["id"],
+            Text.from_dict(data["name"]),
+            Text.from_dict(data["description"]),
+            _intern(data["category"]),
+            tuple(Prop.from_dict(prop) for prop in data["props"]),
+            data["codeExample"],
+        )
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """还原成 JSON 结构；fields 不为 None 时只输出这些字段（按给出的顺序）"""
+        if fields is None:
+            fields = ("id", "name", "description", "category", "props", "codeExample")
+        return {field: self._field(field) for field in fields}
+
+    def _field(self, field: str) -> Any:
+        if field == "id":
+            return self.id
+        if field == "name":
+            return self.name.to_dict()
+        if field == "description":
+            return self.description.to_dict()
+        if field == "category":
+            return self.category
+        if field == "props":
+            return [prop.to_dict() for prop in self.props]
+        if field == "codeExample":
+            return self.code_example
+        raise KeyError(field)
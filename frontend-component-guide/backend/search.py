@@ -0,0 +1,347 @@
+"""
+组件全文搜索
+
+在内存中为组件的中英文名称、描述、属性名和属性说明建立倒排索引：
+- 英文按单词切分，驼峰命名的属性名（onClick）同时拆成 on / click
+- 中文没有空格分词，按单字和相邻两字（bigram）建索引
+- 查询的最后一个英文词按前缀匹配，用于输入联想
+- 每个词的权重 = 字段权重 × idf，在建索引时算好，查询时只做累加
+- 倒排表用 array 存储（组件序号 + float32 得分），10 万组件时也不会占用太多内存
+
+查询的耗时不随目录大小增长：
+- 倒排表另外保存按得分从高到低的顺序，查询从最短的一组开始按得分顺序取候选，
+  前 limit 名确定后（剩下的候选得分上限已经进不了前 limit 名）就提前结束
+- 前缀只展开包含组件最多的 MAX_PREFIX_EXPANSIONS 个词，合并成一张倒排表
+  （每个组件取最高得分），检查一个候选只需一次二分查找；命中很多的前缀在建索引时
+  就合并好，其余的查询时合并并缓存；和其他词一起查询时，单个字母的前缀只做完整匹配
+- 前 limit 名凑齐后最多再检查到第 MAX_SCANNED 个候选，提前结束时命中总数是按比例
+  估算的；检查了 MAX_SCANNED 个候选还凑不齐时，直接对各组求交集
+
+索引随 ComponentIndex 一起构建，创建后只读。
+"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from functools import lru_cache, partial
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 各字段的权重，名称命中比描述命中更重要
+FIELD_WEIGHTS = {
+    "name": 10.0,
+    "prop_name": 3.0,
+    "description": 2.0,
+    "prop_description": 1.0,
+}
+# 前缀最多展开的词数，避免一个字母展开成整个词表
+MAX_PREFIX_EXPANSIONS = 16
+# 展开的词命中数之和不少于这个值的前缀在建索引时合并好，其余的查询时最多看
+# MAX_PREFIX_SCAN 个词，合并结果缓存 PREFIX_CACHE_SIZE 个
+MERGED_PREFIX_MIN = 4096
+MAX_PREFIX_SCAN = 1024
+PREFIX_CACHE_SIZE = 1024
+# 和其他词一起查询时，短于这个长度的前缀只做完整匹配
+MIN_PREFIX_LEN = 2
+# 前缀命中相对完整命中的折扣
+PREFIX_FACTOR = 0.5
+# 一次查询最多检查的候选组件数
+MAX_SCANNED = 500
+
+_RUN_RE = re.compile(r"[0-9A-Za-z]+|[㐀-䶿一-鿿豈-﫿]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def _is_cjk(run: str) -> bool:
+    return not run[0].isascii()
+
+
+def tokenize(text: str) -> List[str]:
+    """把一段文本切成索引词：英文单词（含驼峰拆分）、中文单字和二元组"""
+    tokens = []
+    for run in _RUN_RE.findall(text):
+        if _is_cjk(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            word = run.lower()
+            tokens.append(word)
+            parts = _CAMEL_RE.findall(run)
+            if len(parts) > 1:
+                tokens.extend(part.lower() for part in parts)
+    return tokens
+
+
+def _query_terms(query: str) -> Tuple[List[str], str]:
+    """
+    把查询切成必须命中的词，返回 (完整匹配的词, 前缀匹配的词)
+    中文连续两个字以上只用二元组，单字才用单字；英文最后一个词作为前缀
+    """
+    terms = []
+    prefix = ""
+    runs = _RUN_RE.findall(query)
+    for i, run in enumerate(runs):
+        if _is_cjk(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[j:j + 2] for j in range(len(run) - 1))
+        elif i == len(runs) - 1 and not query[-1:].isspace():
+            prefix = run.lower()
+        else:
+            terms.append(run.lower())
+    return terms, prefix
+
+
+class Posting:
+    """
+    一个词的倒排表：按组件序号升序排列的两个紧凑数组，外加按得分从高到低的下标
+    每条只占 12 字节，比 {序号: 得分} 字典小一个数量级；接口与字典的 get / items 一致
+    """
+
+    __slots__ = ("docs", "scores", "ranked")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.scores = array("f")
+        self.ranked = array("I")
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def finish(self, idf: float) -> None:
+        """乘上 idf 并排好得分顺序，之后不再修改"""
+        self.scores = array("f", [score * idf for score in self.scores])
+        self.rank()
+
+    def rank(self) -> None:
+        """按得分从高到低排好下标"""
+        scores = self.scores
+        # 稳定排序，得分相同时保持目录顺序
+        self.ranked = array("I", sorted(range(len(scores)), key=scores.__getitem__, reverse=True))
+
+    @property
+    def max_score(self) -> float:
+        return self.scores[self.ranked[0]]
+
+    def items(self) -> Iterator[Tuple[int, float]]:
+        return zip(self.docs, self.scores)
+
+    def ranked_items(self) -> Iterator[Tuple[int, float]]:
+        """按得分从高到低（相同时按组件序号）给出 (组件序号, 得分)"""
+        docs = self.docs
+        scores = self.scores
+        for i in self.ranked:
+            yield docs[i], scores[i]
+
+    def get(self, doc: int, default: Optional[float] = None) -> Optional[float]:
+        docs = self.docs
+        i = bisect_left(docs, doc)
+        if i < len(docs) and docs[i] == doc:
+            return self.scores[i]
+        return default
+
+
+def _merge(postings: Dict[str, Posting], members: Tuple[Tuple[str, float], ...]) -> Posting:
+    """把几个词的倒排表合并成一张，每个组件取各词中的最高得分"""
+    best: Dict[int, float] = {}
+    get = best.get
+    for term, factor in members:
+        posting = postings[term]
+        for doc, score in zip(posting.docs, posting.scores):
+            score *= factor
+            if score > get(doc, 0.0):
+                best[doc] = score
+    merged = Posting()
+    merged.docs = array("I", sorted(best))
+    merged.scores = array("f", map(best.__getitem__, merged.docs))
+    merged.rank()
+    return merged
+
+
+class SearchIndex:
+    """组件倒排索引：词 -> Posting"""
+
+    __slots__ = ("ids", "postings", "terms", "prefixes", "_merged")
+
+    def __init__(self, components: Iterable[Dict[str, Any]]):
+        ids: List[str] = []
+        postings: Dict[str, Posting] = {}
+        # 属性名、属性说明在组件之间大量重复，同一段文本只切一次；组件自己的名称和描述
+        # 各不相同，不放进缓存，否则建完索引后一次释放十几万条缓存会长时间持有 GIL
+        token_cache: Dict[str, Tuple[str, ...]] = {}
+
+        def add(weights: Dict[str, float], text: str, weight: float, cache: bool = False) -> None:
+            tokens = token_cache.get(text) if cache else None
+            if tokens is None:
+                tokens = tuple(tokenize(text))
+                if cache:
+                    token_cache[text] = tokens
+            for token in tokens:
+                weights[token] = weights.get(token, 0.0) + weight
+
+        for doc, component in enumerate(components):
+            ids.append(component["id"])
+            weights: Dict[str, float] = {}
+            add(weights, component["id"], FIELD_WEIGHTS["name"])
+            for text in component["name"].values():
+                add(weights, text, FIELD_WEIGHTS["name"])
+            for text in component["description"].values():
+                add(weights, text, FIELD_WEIGHTS["description"])
+            for prop in component["props"]:
+                add(weights, prop["name"], FIELD_WEIGHTS["prop_name"], cache=True)
+                for text in prop["description"].values():
+                    add(weights, text, FIELD_WEIGHTS["prop_description"], cache=True)
+            # doc 递增，直接追加就是有序的
+            for term, weight in weights.items():
+                posting = postings.get(term)
+                if posting is None:
+                    posting = postings[term] = Posting()
+                posting.docs.append(doc)
+                posting.scores.append(weight)
+
+        # 把 idf 乘进去，查询时只需累加
+        total = len(ids)
+        for posting in postings.values():
+            posting.finish(math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5)))
+
+        self.ids = ids
+        self.postings = postings
+        # 排好序的词表，用于前缀查找
+        self.terms = tuple(sorted(postings))
+
+        # 命中很多的前缀 -> 合并好的倒排表；查询时合并它们太慢
+        # 几个前缀展开成同一组词时（d / di / dis）共用一张表
+        candidates: Dict[str, List[str]] = {}
+        for term in self.terms:
+            if not term.isascii():
+                continue
+            for length in range(1, len(term)):
+                candidates.setdefault(term[:length], []).append(term)
+        merged: Dict[Tuple[Tuple[str, float], ...], Posting] = {}
+        self.prefixes: Dict[str, Posting] = {}
+        for prefix, terms in candidates.items():
+            members = self._members(prefix, terms)
+            if sum(len(postings[term]) for term, _ in members) < MERGED_PREFIX_MIN:
+                continue
+            posting = merged.get(members)
+            if posting is None:
+                posting = merged[members] = _merge(postings, members)
+            self.prefixes[prefix] = posting
+        # 不引用 self，索引里没有循环引用
+        self._merged = lru_cache(maxsize=PREFIX_CACHE_SIZE)(partial(_merge, postings))
+
+    def _members(self, prefix: str, terms: Iterable[str]) -> Tuple[Tuple[str, float], ...]:
+        """前缀展开成的 ((词, 折扣), ...)：prefix 本身（完整命中）加上以它开头、命中组件最多的几个词"""
+        postings = self.postings
+        expansions = heapq.nlargest(
+            MAX_PREFIX_EXPANSIONS,
+            (term for term in terms if term != prefix),
+            key=lambda term: len(postings[term]),
+        )
+        members = tuple((term, PREFIX_FACTOR) for term in expansions)
+        if prefix in postings:
+            members = ((prefix, 1.0),) + members
+        return members
+
+    def _prefix_match(self, prefix: str) -> Optional[Posting]:
+        """前缀展开后合并成的倒排表，一个词都没有时返回 None"""
+        posting = self.prefixes.get(prefix)
+        if posting is not None:
+            return posting
+        terms = self.terms
+        start = bisect_left(terms, prefix)
+        end = bisect_left(terms, prefix + "\uffff", start, min(start + MAX_PREFIX_SCAN, len(terms)))
+        members = self._members(prefix, terms[start:end])
+        if not members:
+            return None
+        if members == ((prefix, 1.0),):
+            return self.postings[prefix]
+        return self._merged(members)
+
+    def search(self, query: str, limit: int = 20) -> Tuple[List[Tuple[str, float]], int, bool]:
+        """
+        返回 ([(组件 id, 得分)], 命中总数, 命中总数是否准确)，按得分从高到低排序
+        所有查询词都必须命中（AND）
+        """
+        terms, prefix = _query_terms(query)
+        groups: List[Posting] = []
+        for term in dict.fromkeys(terms):
+            posting = self.postings.get(term)
+            if not posting:
+                return [], 0, True
+            groups.append(posting)
+        if prefix and groups and len(prefix) < MIN_PREFIX_LEN:
+            # 还没输完的单个字母展开后几乎不过滤什么，只在恰好是一个词时才用
+            posting = self.postings.get(prefix)
+            if posting is not None and posting not in groups:
+                groups.append(posting)
+        elif prefix:
+            match = self._prefix_match(prefix)
+            if match is None:
+                return [], 0, True
+            groups.append(match)
+        if not groups:
+            return [], 0, True
+
+        # 从最短的一组开始，按得分顺序取候选，到其他组里查得分
+        groups.sort(key=len)
+        first, rest = groups[0], groups[1:]
+        ids = self.ids
+        if not rest:
+            # 只有一组时得分顺序就是结果顺序
+            top = list(islice(first.ranked_items(), limit))
+            return [(ids[doc], round(score, 4)) for doc, score in top], len(first), True
+
+        # 其他组能贡献的最高得分
+        rest_max = sum(group.max_score for group in rest)
+        # 候选不多时全部检查，命中总数是准确的
+        exhaustive = len(first) <= MAX_SCANNED
+        heap: List[Tuple[float, int]] = []
+        hits = scanned = 0
+        exact = True
+        intersected = None
+        for doc, score in first.ranked_items():
+            if not exhaustive and scanned >= MAX_SCANNED and len(heap) < limit:
+                # 得分高的候选大多不是全部命中，逐个检查太慢，直接求交集
+                intersected = self._intersect(groups, limit)
+                break
+            if not exhaustive and len(heap) == limit and (
+                scanned >= MAX_SCANNED
+                # 剩下的候选最多和第 limit 名同分，同分时不再保证按目录顺序取舍
+                or heap[0][0] >= score + rest_max
+            ):
+                exact = False
+                break
+            scanned += 1
+            for group in rest:
+                other = group.get(doc)
+                if other is None:
+                    break
+                score += other
+            else:
+                hits += 1
+                # 得分相同时按目录顺序，序号取负后越小越靠前
+                item = (score, -doc)
+                if len(heap) < limit:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+        if intersected is not None:
+            heap, total = intersected
+        elif exact:
+            total = hits
+        else:
+            total = max(len(heap), round(hits * len(first) / scanned))
+        top = sorted(heap, reverse=True)
+        return [(ids[-neg_doc], round(score, 4)) for score, neg_doc in top], total, exact
+
+    @staticmethod
+    def _intersect(groups: List[Posting], limit: int) -> Tuple[List[Tuple[float, int]], int]:
+        """各组求交集并累加得分，返回 ([(得分, -组件序号)] 前 limit 名, 命中总数)"""
+        scores = dict(zip(groups[0].docs, groups[0].scores))
+        for group in groups[1:]:
+            scores = {doc: scores[doc] + score for doc, score in zip(group.docs, group.scores) if doc in scores}
+        return heapq.nlargest(limit, ((score, -doc) for doc, score in scores.items())), len(scores)
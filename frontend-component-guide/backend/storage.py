@@ -0,0 +1,198 @@
+"""
+组件目录文件
+
+目录数据放在 JSON Lines 文件里（默认 data/components.jsonl）：
+- 第一行是文件头：{"version": 1, "categories": {分类: 标题, ...}}
+- 之后每行一个组件，内容就是该组件的 JSON
+
+文件以只读方式 mmap 进来，启动时只扫描换行符记下每行的位置，组件在用到时
+才解码。多个 worker 映射同一个文件时共用操作系统的页缓存，常驻内存不会随
+worker 数量和目录大小线性增长。每行本身就是 /api/components/{id} 的响应体，
+可以直接从映射里切出来返回。
+
+映射中的文件如果被原地改写或截断，读到被截掉的部分时进程会收到 SIGBUS 崩溃，
+没截断时也会按旧的位置切出错误的内容。所以服务端不直接映射目录文件，而是
+先把它复制成快照目录（snapshot_dir）里的一个只读快照再映射。快照按源文件的
+(inode, 大小, 修改时间) 命名，多个 worker 加载同一版本时共用同一个快照，
+仍然共享页缓存；源文件随便怎么编辑都不会影响正在映射的快照。
+自己更新目录时最好还是用 write_catalog（先写临时文件再原子替换），
+避免服务端复制到写了一半的文件。
+
+命令行用法：
+    python storage.py build components.json data/components.jsonl   # 嵌套 JSON -> jsonl
+    python storage.py dump data/components.jsonl components.json     # jsonl -> 嵌套 JSON
+"""
+import json
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+from http_cache import dump_json
+
+FORMAT_VERSION = 1
+# 复制快照时每次读写的字节数
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def file_signature(st: os.stat_result) -> Tuple[int, int, int]:
+    """文件的 (inode, 大小, 修改时间)，任意一项变化都说明文件被改过或替换过"""
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _snapshot_name(path: str, st: os.stat_result) -> str:
+    return "%s.%d-%d-%d" % ((os.path.basename(path),) + file_signature(st))
+
+
+def open_snapshot(source: BinaryIO, path: str, st: os.stat_result, directory: str) -> BinaryIO:
+    """
+    打开 path 当前版本（st）在 directory 中的只读快照，还没有时从 source 复制一份
+    复制期间源文件被改动时抛出 ValueError
+    """
+    target = os.path.join(directory, _snapshot_name(path, st))
+    try:
+        return open(target, "rb")
+    except FileNotFoundError:
+        pass
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(source, f, COPY_BUFFER_SIZE)
+        if file_signature(os.fstat(source.fileno())) != file_signature(st):
+            raise ValueError(f"目录文件 {path} 在复制期间被修改")
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return open(target, "rb")
+
+
+def remove_snapshots(path: str, directory: str, keep: "CatalogStore") -> None:
+    """删除 path 除 keep 以外的旧快照；其他进程还在映射的快照删掉后映射仍然有效"""
+    prefix = os.path.basename(path) + "."
+    keep_name = os.path.basename(keep.mapped_path)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.startswith(prefix) and name != keep_name and not name.endswith(".tmp"):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+class CatalogStore:
+    """
+    只读映射的组件目录文件
+    指定 snapshot_dir 时映射的是目录文件的快照（见模块说明），源文件之后的改动不影响本对象
+    """
+
+    def __init__(self, path: str, snapshot_dir: Optional[str] = None):
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.mtime = st.st_mtime
+            # 用于判断磁盘上的文件是否已被替换
+            self.signature = file_signature(st)
+            if snapshot_dir is None:
+                self.mapped_path = path
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                with open_snapshot(f, path, st, snapshot_dir) as snapshot:
+                    self.mapped_path = snapshot.name
+                    self._mm = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+
+        mm = self._mm
+        header_end = mm.find(b"\n")
+        if header_end < 0:
+            header_end = len(mm)
+        header = json.loads(mm[:header_end])
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的目录文件版本: {header.get('version')}")
+        # 分类 -> 标题，保持文件中的顺序
+        self.titles: Dict[str, str] = header["categories"]
+
+        # 每行组件在文件中的起止位置
+        starts = array("Q")
+        ends = array("Q")
+        pos = header_end + 1
+        size = len(mm)
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = size
+            if end > pos:
+                starts.append(pos)
+                ends.append(end)
+            pos = end + 1
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def raw(self, record: int) -> bytes:
+        """第 record 个组件的原始 JSON 字节"""
+        return self._mm[self._starts[record]:self._ends[record]]
+
+    def component(self, record: int) -> Dict[str, Any]:
+        """解码第 record 个组件"""
+        return json.loads(self.raw(record))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for record in range(len(self._starts)):
+            yield self.component(record)
+
+
+def write_catalog(path: str, categories: Dict[str, Any]) -> None:
+    """
+    把嵌套结构的目录（{分类: {"title", "components"}}）写成 jsonl 文件
+    先写到同目录的临时文件再原子替换，正在映射旧文件的进程不受影响
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    header = {
+        "version": FORMAT_VERSION,
+        "categories": {key: data["title"] for key, data in categories.items()},
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dump_json(header) + b"\n")
+            for data in categories.values():
+                for component in data["components"]:
+                    f.write(dump_json(component) + b"\n")
+        # mkstemp 创建的文件只有属主可读，其他用户运行的 worker 也要能读
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_catalog(path: str) -> Dict[str, Any]:
+    """把 jsonl 文件读回嵌套结构的目录"""
+    store = CatalogStore(path)
+    categories = {key: {"title": title, "components": []} for key, title in store.titles.items()}
+    for component in store:
+        categories[component["category"]]["components"].append(component)
+    return categories
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("build", "dump"):
+        print(__doc__)
+        sys.exit(1)
+    command, source, target = sys.argv[1:]
+    if command == "build":
+        with open(source, encoding="utf-8") as f:
+            write_catalog(target, json.load(f))
+    else:
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(read_catalog(source), f, ensure_ascii=False, indent=2)
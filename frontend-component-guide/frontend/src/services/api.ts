@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { ApiResponse, Component } from '../types';
+import { ApiResponse, Component, ComponentBatch, ComponentListParams, ComponentPage } from '../types';
 
 const API_BASE_URL = 'http://localhost:8000/api';
 
@@ -8,14 +8,79 @@ const api = axios.create({
   timeout: 10000,
 });
 
+// 批量接口一次最多接受的 id 数，与后端 MAX_BATCH_SIZE 一致
+const MAX_BATCH_SIZE = 200;
+
+interface PendingRequest {
+  resolve: (component: Component) => void;
+  reject: (error: unknown) => void;
+}
+
+// 本轮事件循环中等待合并的 getComponent 调用：id -> 等待者
+let pendingRequests: Map<string, PendingRequest[]> | null = null;
+
+const fetchBatch = async (ids: string[], batch: Map<string, PendingRequest[]>) => {
+  try {
+    // 只有一个 id 时仍走单个组件接口，可以用上浏览器的 HTTP 缓存
+    const components: Component[] = ids.length === 1
+      ? [(await api.get(`/components/${ids[0]}`)).data]
+      : (await api.get<ComponentBatch>('/components:batch', { params: { ids: ids.join(',') } })).data.items;
+    const found: Record<string, Component> = {};
+    components.forEach((component) => {
+      found[component.id] = component;
+    });
+    ids.forEach((id) => {
+      const component = found[id];
+      batch.get(id)!.forEach(({ resolve, reject }) =>
+        component ? resolve(component) : reject(new Error(`组件未找到: ${id}`))
+      );
+    });
+  } catch (error) {
+    ids.forEach((id) => batch.get(id)!.forEach(({ reject }) => reject(error)));
+  }
+};
+
+const flushPendingRequests = () => {
+  const batch = pendingRequests!;
+  pendingRequests = null;
+  const ids = Array.from(batch.keys());
+  for (let i = 0; i < ids.length; i += MAX_BATCH_SIZE) {
+    fetchBatch(ids.slice(i, i + MAX_BATCH_SIZE), batch);
+  }
+};
+
 export const componentApi = {
   getAllComponents: async (): Promise<ApiResponse> => {
     const response = await api.get('/components');
     return response.data;
   },
 
-  getComponent: async (id: string): Promise<Component> => {
-    const response = await api.get(`/components/${id}`);
+  // 分页 / 按分类过滤 / 只取部分字段，例如 fields: ['id', 'name', 'description']
+  listComponents: async (params: ComponentListParams = {}): Promise<ComponentPage> => {
+    const { fields, ...rest } = params;
+    const response = await api.get('/components', {
+      params: { ...rest, fields: fields?.join(',') },
+    });
+    return response.data;
+  },
+
+  // 同一轮事件循环内的多次调用会合并成一次 /components:batch 请求
+  getComponent: (id: string): Promise<Component> =>
+    new Promise((resolve, reject) => {
+      if (!pendingRequests) {
+        pendingRequests = new Map();
+        setTimeout(flushPendingRequests, 0);
+      }
+      const waiters = pendingRequests.get(id);
+      if (waiters) {
+        waiters.push({ resolve, reject });
+      } else {
+        pendingRequests.set(id, [{ resolve, reject }]);
+      }
+    }),
+
+  getComponents: async (ids: string[]): Promise<ComponentBatch> => {
+    const response = await api.post('/components:batch', { ids });
     return response.data;
   },
 
@@ -28,4 +28,22 @@ export interface Category {
 export interface ApiResponse {
   categories: Record<string, Category>;
   allComponents: Component[];
+}
+
+export interface ComponentListParams {
+  limit?: number;
+  cursor?: string;
+  category?: string;
+  fields?: (keyof Component)[];
+}
+
+export interface ComponentPage {
+  items: Partial<Component>[];
+  nextCursor: string | null;
+  total: number;
+}
+
+export interface ComponentBatch {
+  items: Component[];
+  missing: string[];
 }
\ No newline at end of file
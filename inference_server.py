@@ -0,0 +1,151 @@
+"""
+NeuralNetwork 推理服务
+
+每个请求只有一个样本，逐个调用 query() 时大部分时间花在 NumPy 每次调用的固定开销上。
+这里把同时到达的请求攒成一批（最多 MAX_BATCH_SIZE 个，第一个请求最多等 MAX_WAIT_MS 毫秒），
+整批做一次矩阵乘法，再把每一行结果分别返回给对应的请求。
+计算在线程中进行（矩阵乘法会释放 GIL），计算期间事件循环继续收集下一批。
+
+启动（权重文件由 NeuralNetwork.save() 生成）：
+    NEURALNET_WEIGHTS=weights.bin uvicorn inference_server:app --port 8001
+
+    curl -X POST localhost:8001/predict -H 'Content-Type: application/json' -d '{"inputs": [0.1, 0.5, 0.9]}'
+"""
+import asyncio
+import os
+from typing import List, Optional
+
+import numpy
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from neuralnet import NeuralNetwork
+
+WEIGHTS_PATH = os.environ.get("NEURALNET_WEIGHTS", "weights.bin")
+# 一批最多多少个样本
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "64"))
+# 一批中第一个请求最多等待的毫秒数
+MAX_WAIT_MS = float(os.environ.get("MAX_WAIT_MS", "2"))
+
+
+class MicroBatcher:
+    """把并发的单样本请求合并成批调用 network.query()"""
+
+    def __init__(self, network, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT_MS / 1000):
+        self.network = network
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 统计：处理过的批数和样本数
+        self.batches = 0
+        self.samples = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def predict(self, inputs: numpy.ndarray) -> numpy.ndarray:
+        """提交一个样本，等它所在的批算完后返回这个样本的输出"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((inputs, future))
+        return await future
+
+    async def _collect(self):
+        """取出一批：先等到第一个请求，再在 max_wait 内尽量多收"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # 已经在排队的直接拿，不用等
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # 等待期间被取消（客户端断开）的请求不再计算
+            batch = [(inputs, future) for inputs, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                outputs = await loop.run_in_executor(
+                    None, self.network.query, numpy.stack([inputs for inputs, _ in batch])
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.samples += len(batch)
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+
+app = FastAPI(title="NeuralNetwork 推理服务", version="1.0.0")
+network: Optional[NeuralNetwork] = None
+batcher: Optional[MicroBatcher] = None
+
+
+class PredictRequest(BaseModel):
+    inputs: List[float]
+
+
+@app.on_event("startup")
+async def start_batcher():
+    global network, batcher
+    # 内存映射方式加载，多个 worker 共享同一份权重
+    network = NeuralNetwork.load(WEIGHTS_PATH)
+    batcher = MicroBatcher(network)
+    batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    if batcher is not None:
+        await batcher.stop()
+
+
+@app.post("/predict")
+async def predict(request: PredictRequest):
+    """返回网络各输出节点的值和值最大的节点（分类结果）"""
+    if len(request.inputs) != network.inodes:
+        raise HTTPException(status_code=400, detail=f"inputs 需要 {network.inodes} 个值")
+    outputs = await batcher.predict(numpy.asarray(request.inputs, dtype=network.wih.dtype))
+    return {"outputs": outputs.tolist(), "label": int(numpy.argmax(outputs))}
+
+
+@app.get("/stats")
+async def stats():
+    """已处理的批数、样本数和平均每批的样本数"""
+    return {
+        "batches": batcher.batches,
+        "samples": batcher.samples,
+        "avgBatchSize": round(batcher.samples / batcher.batches, 2) if batcher.batches else 0,
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("inference_server:app", host="0.0.0.0", port=8001)
@@ -0,0 +1,109 @@
+"""
+流式运行 Agent
+
+stream_agent() 是一个异步生成器，Agent 运行过程中边产生边给出事件，不用等整个回答生成完：
+- {"type": "token", "text": ...}             LLM 输出的原始 token
+- {"type": "answer", "text": ...}            解析出的 answer 字段新增的文字（用来逐字显示）
+- {"type": "tool_start", "tool": ..., "input": ...}
+- {"type": "tool_end", "tool": ..., "output": ...}
+- {"type": "final", "answer": ..., "sources": [...]}   最后一个事件，完整的结果
+
+LLM 按 {"answer": "...", "sources": [...]} 的 JSON 格式回答，AnswerParser 在 JSON 还没
+输出完时就把 answer 已有的部分解析出来；LLM 没有按 JSON 回答时整段输出都当作 answer。
+"""
+import json
+from typing import Any, AsyncIterator, Dict
+
+from langchain_core.runnables import Runnable
+from langchain_core.utils.json import parse_partial_json
+
+
+def _strip_fence(text: str) -> str:
+    """去掉 ```json ... ``` 代码块标记"""
+    text = text.strip()
+    if text.startswith("```"):
+        newline = text.find("\n")
+        text = text[newline + 1:] if newline >= 0 else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text
+
+
+class AnswerParser:
+    """增量解析 LLM 输出的 {"answer": ..., "sources": [...]}"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.answer = ""
+        # None 表示还没看到第一个非空字符，不知道是不是 JSON
+        self.is_json = None
+
+    def feed(self, chunk: str) -> str:
+        """加入一段新输出，返回 answer 新增的文字"""
+        self.buffer += chunk
+        if self.is_json is None:
+            head = self.buffer.lstrip()
+            if not head:
+                return ""
+            self.is_json = head.startswith(("{", "```"))
+            if not self.is_json:
+                chunk = head
+        if not self.is_json:
+            self.answer += chunk
+            return chunk
+
+        data = parse_partial_json(_strip_fence(self.buffer))
+        answer = data.get("answer") if isinstance(data, dict) else None
+        if not isinstance(answer, str) or not answer.startswith(self.answer):
+            return ""
+        delta = answer[len(self.answer):]
+        self.answer = answer
+        return delta
+
+    def result(self) -> Dict[str, Any]:
+        """完整的解析结果；不是合法的 JSON 时整段输出作为 answer"""
+        return parse_output(self.buffer)
+
+
+def parse_output(text: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(_strip_fence(text))
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or not isinstance(data.get("answer"), str):
+        return {"answer": text, "sources": []}
+    sources = data.get("sources") or []
+    return {"answer": data["answer"], "sources": [str(source) for source in sources]}
+
+
+async def stream_agent(agent_executor: Runnable, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """运行 agent_executor，逐个给出运行过程中的事件（格式见模块说明）"""
+    parser = AnswerParser()
+    root_run_id = None
+    output = None
+    async for event in agent_executor.astream_events(inputs, version="v1"):
+        kind = event["event"]
+        if root_run_id is None:
+            # 第一个事件是 agent_executor 自己开始运行
+            root_run_id = event["run_id"]
+        if kind == "on_chat_model_start":
+            # 每一轮 LLM 调用重新解析，最终回答来自最后一轮
+            parser = AnswerParser()
+        elif kind == "on_chat_model_stream":
+            text = event["data"]["chunk"].content
+            if not text:
+                # 只包含工具调用参数的片段
+                continue
+            yield {"type": "token", "text": text}
+            delta = parser.feed(text)
+            if delta:
+                yield {"type": "answer", "text": delta}
+        elif kind == "on_tool_start":
+            yield {"type": "tool_start", "tool": event["name"], "input": event["data"].get("input")}
+        elif kind == "on_tool_end":
+            yield {"type": "tool_end", "tool": event["name"], "output": str(event["data"].get("output"))}
+        elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+            output = (event["data"].get("output") or {}).get("output")
+    # 以 agent_executor 的最终输出为准，拿不到时用最后一轮 LLM 的输出
+    result = parse_output(output) if isinstance(output, str) else parser.result()
+    yield {"type": "final", **result}
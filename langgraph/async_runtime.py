@@ -0,0 +1,274 @@
+"""
+异步 Agent 运行时
+
+AgentExecutor 一次只运行一个会话，工具也是同步调用的。这里用 asyncio 实现同样的
+“LLM 决定调用工具 -> 执行工具 -> 把结果交回 LLM”循环：
+- 模型在一轮里请求多个工具调用时，这些调用并发执行
+- 每个工具有各自的超时时间，超时或出错时把错误信息作为工具结果交回模型，不中断整个回答
+- 所有会话共享一个并发上限，避免同时发出过多的外部请求
+- 取消一次回答（例如客户端断开）时，正在执行的工具调用也一并取消
+- 一个进程里可以同时服务很多会话，每个会话有自己的对话历史；等待 LLM 和工具的 I/O
+  时不占用线程（只有没有异步实现的工具才会放到线程池里执行）
+- 空闲超过 session_ttl 秒的会话、以及超过 max_sessions 个时最久没用的会话会被清除
+
+超时只是不再等待：没有异步实现的工具在线程里继续运行，线程无法被强行停止。
+这类工具（例如计算器）自己要保证计算量有上限。
+
+python async_runtime.py 用一个会并发请求多个工具的假模型离线自检。
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import BaseTool
+
+# 同时执行的工具调用数上限（所有会话共享）
+MAX_CONCURRENCY = 16
+# 没有单独设置时工具的超时时间（秒）
+DEFAULT_TIMEOUT = 30.0
+# 一次回答中最多调用 LLM 的轮数
+MAX_ITERATIONS = 6
+# 每个会话保留的历史消息数
+MAX_HISTORY = 20
+# 会话空闲多少秒后清除
+SESSION_TTL = 3600.0
+# 最多保留的会话数
+MAX_SESSIONS = 10_000
+
+
+class AsyncToolExecutor:
+    """并发执行一轮中的所有工具调用"""
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        max_concurrency: int = MAX_CONCURRENCY,
+        default_timeout: float = DEFAULT_TIMEOUT,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.tools = {tool.name: tool for tool in tools}
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _call(self, tool_call: Dict[str, Any]) -> ToolMessage:
+        name = tool_call["name"]
+        tool = self.tools.get(name)
+        if tool is None:
+            content = f"没有名为 {name} 的工具"
+        else:
+            timeout = self.timeouts.get(name, self.default_timeout)
+            try:
+                async with self._semaphore:
+                    result = await asyncio.wait_for(tool.ainvoke(tool_call["args"]), timeout)
+                content = str(result)
+            except asyncio.TimeoutError:
+                content = f"工具 {name} 超过 {timeout:g} 秒没有返回"
+            except Exception as e:
+                content = f"工具 {name} 执行出错: {e}"
+        return ToolMessage(content=content, tool_call_id=tool_call["id"])
+
+    async def run(self, tool_calls: Sequence[Dict[str, Any]]) -> List[ToolMessage]:
+        """执行所有工具调用，结果按调用的顺序返回；被取消时所有未完成的调用一起取消"""
+        return list(await asyncio.gather(*(self._call(tool_call) for tool_call in tool_calls)))
+
+
+class _Session:
+    __slots__ = ("history", "lock", "last_used")
+
+    def __init__(self):
+        self.history: List[BaseMessage] = []
+        # 同一会话的消息依次处理，不同会话之间并发
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class AsyncAgentRuntime:
+    """用同一个模型和同一组工具服务多个会话"""
+
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        tools: Sequence[BaseTool],
+        system_prompt: str,
+        executor: Optional[AsyncToolExecutor] = None,
+        max_iterations: int = MAX_ITERATIONS,
+        max_history: int = MAX_HISTORY,
+        session_ttl: float = SESSION_TTL,
+        max_sessions: int = MAX_SESSIONS,
+    ):
+        self.llm = llm.bind_tools(tools)
+        self.system_message = SystemMessage(content=system_prompt)
+        self.executor = executor or AsyncToolExecutor(tools)
+        self.max_iterations = max_iterations
+        self.max_history = max_history
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        # session_id -> 会话，按最近使用排序
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+
+    def _session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+    def _evict(self, keep: str) -> None:
+        """清除空闲太久的会话，以及超出数量上限时最久没用的会话；keep 和正在回答的会话不动"""
+        expired_before = time.monotonic() - self.session_ttl
+        for session_id, session in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions and session.last_used > expired_before:
+                # 后面的会话都更新，不用再看
+                break
+            if session_id != keep and not session.lock.locked():
+                del self._sessions[session_id]
+
+    async def run(self, session_id: str, query: str) -> str:
+        """回答 session_id 会话中的一个问题，返回模型的最终输出"""
+        session = self._session(session_id)
+        self._evict(keep=session_id)
+        async with session.lock:
+            history = session.history
+            messages: List[BaseMessage] = [self.system_message, *history, HumanMessage(content=query)]
+            for _ in range(self.max_iterations):
+                reply: AIMessage = await self.llm.ainvoke(messages)
+                messages.append(reply)
+                if not reply.tool_calls:
+                    break
+                messages.extend(await self.executor.run(reply.tool_calls))
+            else:
+                reply = AIMessage(content="工具调用次数过多，没有得到最终答案")
+
+            # 历史里只保留问题和最终回答，中间的工具调用不带到下一轮
+            history = [*history, HumanMessage(content=query), AIMessage(content=reply.content)]
+            session.history = history[-self.max_history:]
+            session.last_used = time.monotonic()
+            return reply.content
+
+    async def reset(self, session_id: str) -> None:
+        """清除会话的历史；会话正在回答时等它答完再清除"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        async with session.lock:
+            session.history = []
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+if __name__ == "__main__":
+    # 离线自检：假模型第一轮同时请求所有工具，拿到结果后把它们拼起来作为回答
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langchain_core.tools import StructuredTool
+
+    class StubChatModel(BaseChatModel):
+        tool_names: List[str]
+
+        @property
+        def _llm_type(self) -> str:
+            return "stub"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            if isinstance(messages[-1], ToolMessage):
+                results = sorted(m.content for m in messages if isinstance(m, ToolMessage))
+                message = AIMessage(content=" | ".join(results))
+            else:
+                message = AIMessage(content="", tool_calls=[
+                    {"name": name, "args": {"query": messages[-1].content}, "id": f"call_{i}"}
+                    for i, name in enumerate(self.tool_names)
+                ])
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    in_flight = 0
+    peak = 0
+    cancelled = 0
+
+    async def slow(query: str) -> str:
+        global in_flight, peak, cancelled
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(0.2)
+            return f"slow:{query}"
+        except asyncio.CancelledError:
+            cancelled += 1
+            raise
+        finally:
+            in_flight -= 1
+
+    async def hang(query: str) -> str:
+        await asyncio.sleep(10)
+        return "never"
+
+    async def boom(query: str) -> str:
+        raise RuntimeError("boom")
+
+    def upper(query: str) -> str:
+        # 没有异步实现的工具，在线程池里执行
+        return query.upper()
+
+    tools = [
+        StructuredTool.from_function(coroutine=slow, name="slow", description="slow"),
+        StructuredTool.from_function(coroutine=hang, name="hang", description="hang"),
+        StructuredTool.from_function(coroutine=boom, name="boom", description="boom"),
+        StructuredTool.from_function(func=upper, name="upper", description="upper"),
+    ]
+    llm = StubChatModel(tool_names=["slow", "hang", "boom", "upper", "missing"])
+    executor = AsyncToolExecutor(tools, max_concurrency=64, timeouts={"hang": 0.3})
+
+    async def main() -> None:
+        runtime = AsyncAgentRuntime(llm, tools, "stub", executor=executor, session_ttl=0.5, max_sessions=40)
+
+        # 一轮中的五个调用并发执行，超时、出错、不存在的工具都作为结果交回模型
+        started = time.monotonic()
+        answer = await runtime.run("s0", "hi")
+        elapsed = time.monotonic() - started
+        assert elapsed < 0.5, elapsed
+        assert "slow:hi" in answer and "HI" in answer, answer
+        assert "超过 0.3 秒" in answer and "boom" in answer and "没有名为 missing" in answer, answer
+
+        # 50 个会话同时提问：250 个工具调用受并发上限约束，总耗时仍远小于依次执行
+        started = time.monotonic()
+        answers = await asyncio.gather(*(runtime.run(f"s{i}", f"q{i}") for i in range(50)))
+        elapsed = time.monotonic() - started
+        assert elapsed < 1.5, elapsed
+        assert all(f"slow:q{i}" in answer for i, answer in enumerate(answers))
+        assert 8 < peak <= 64, peak
+        # 超过 max_sessions 的会话在下次提问时被清除
+        await runtime.run("extra", "q")
+        assert len(runtime) <= 40, len(runtime)
+
+        # 每个会话只保留问题和最终回答；reset 等正在进行的回答结束后再清除历史
+        assert [m.content for m in runtime._sessions["s49"].history][0] == "q49"
+        running = asyncio.ensure_future(runtime.run("s49", "again"))
+        await asyncio.sleep(0.05)
+        await runtime.reset("s49")
+        assert running.done() and runtime._sessions["s49"].history == []
+
+        # 取消回答时正在执行的工具调用一起取消
+        running = asyncio.ensure_future(runtime.run("s48", "cancel me"))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        try:
+            await running
+        except asyncio.CancelledError:
+            pass
+        assert cancelled == 1, cancelled
+
+        # 空闲超过 session_ttl 的会话被清除
+        await asyncio.sleep(0.6)
+        await runtime.run("fresh", "q")
+        assert len(runtime) == 1, len(runtime)
+
+    asyncio.run(main())
+    print("async_runtime 自检通过")
@@ -0,0 +1,218 @@
+"""
+带磁盘缓存的向量化
+
+CachedEmbeddings 包装任意 LangChain Embeddings：
+- 向量按 模型名 + 文本 的哈希保存在本地 SQLite 文件里，同样的文本不会重复向量化
+  （重建索引、重复的查询都直接命中缓存）
+- 缓存条目数超过 max_entries 时淘汰最久没用过的条目
+- 没命中的文本按 batch_size 分批，最多 max_concurrency 批同时请求
+- 查询向量（embed_query）和文档向量分开缓存，有些模型两者的算法不同
+- 命中时的 last_used 先记在内存里，写入新向量或攒够 TOUCH_BATCH 条时再批量更新，
+  读缓存不用每次都开写事务
+- 异步接口里的 SQLite 读写放到线程里执行，不阻塞事件循环
+
+向量以 float32 保存，和直接调用模型的结果相比有很小的精度损失，不影响相似度检索。
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+# 缓存最多保存的向量数
+MAX_ENTRIES = 100_000
+# 一次请求模型的文本数
+BATCH_SIZE = 256
+# 同时进行的请求数
+MAX_CONCURRENCY = 4
+# 一条 SQL 里最多的参数个数（SQLite 默认上限是 999）
+SQL_CHUNK = 500
+# 命中的条目先记在内存里，攒够这么多条再一次性更新 last_used
+TOUCH_BATCH = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def _model_name(embeddings: Embeddings) -> str:
+    for attr in ("model", "model_name"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, str) and value:
+            return f"{type(embeddings).__name__}:{value}"
+    return type(embeddings).__name__
+
+
+class CachedEmbeddings(Embeddings):
+    """给 underlying 加上磁盘缓存；可以在多个线程之间共享"""
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        path: str,
+        model_name: Optional[str] = None,
+        max_entries: int = MAX_ENTRIES,
+        batch_size: int = BATCH_SIZE,
+        max_concurrency: int = MAX_CONCURRENCY,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name or _model_name(underlying)
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        # 命中过、还没写回 last_used 的 key -> 命中时间
+        self._touched: Dict[str, float] = {}
+
+    def _key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.model_name, kind, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    # ---------- 缓存读写 ----------
+
+    def _lookup(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), SQL_CHUNK):
+                chunk = keys[start:start + SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            for key in found:
+                self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                with self._conn:
+                    self._flush_touched()
+        return found
+
+    def _flush_touched(self) -> None:
+        """把攒下的命中时间写回数据库，调用方持有锁并负责事务"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        with self._lock, self._conn:
+            # 淘汰前先写回命中时间，刚用过的条目不会被当成最久没用的删掉
+            self._flush_touched()
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            self._count += self._conn.total_changes - before
+            excess = self._count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                self._count -= excess
+
+    def _split(self, kind: str, texts: List[str]):
+        """返回 (每个文本的 key, 命中的向量, 需要计算的文本（去重）)"""
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        self.hits += sum(1 for key in keys if key in found)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def _batches(self, missing: Dict[str, str]):
+        items = list(missing.items())
+        return [items[start:start + self.batch_size] for start in range(0, len(items), self.batch_size)]
+
+    # ---------- Embeddings 接口 ----------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._split("document", texts)
+        if missing:
+            batches = self._batches(missing)
+
+            def embed(batch):
+                vectors = self.underlying.embed_documents([text for _, text in batch])
+                return dict(zip((key for key, _ in batch), vectors))
+
+            if len(batches) == 1:
+                results = [embed(batches[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                    results = list(pool.map(embed, batches))
+            for computed in results:
+                self._store(computed)
+                found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        found = self._lookup([key])
+        if key in found:
+            self.hits += 1
+            return found[key]
+        self.misses += 1
+        vector = self.underlying.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await asyncio.to_thread(self._split, "document", texts)
+        if missing:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def embed(batch):
+                async with semaphore:
+                    vectors = await self.underlying.aembed_documents([text for _, text in batch])
+                computed = dict(zip((key for key, _ in batch), vectors))
+                await asyncio.to_thread(self._store, computed)
+                return computed
+
+            for computed in await asyncio.gather(*(embed(batch) for batch in self._batches(missing))):
+                found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        found = await asyncio.to_thread(self._lookup, [key])
+        if key in found:
+            self.hits += 1
+            return found[key]
+        self.misses += 1
+        vector = await self.underlying.aembed_query(text)
+        await asyncio.to_thread(self._store, {key: vector})
+        return vector
+
+    def close(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._flush_touched()
+            self._conn.close()
@@ -0,0 +1,135 @@
+"""
+增量构建 RAG 向量库
+
+每次启动都用 Chroma.from_documents 把所有文档块重新向量化一遍，既慢又费钱。
+这里改成增量同步：
+- 每个文档块的 id 是 来源 + 内容 的哈希，内容不变 id 就不变
+- 已经在持久化的集合里的块直接跳过，只为新增或改动过的块计算向量
+- 来源已经不存在的块、以及来源还在但内容已经变了的旧块，从集合中删除
+- 启动时直接打开 persist_directory 里已有的集合，不重新建
+
+这样启动和向量化的开销只和变化的部分有关，与语料总量无关。
+
+python rag_index.py 用假的向量模型离线自检 新增 / 跳过 / 删除 的行为。
+"""
+import hashlib
+from typing import Iterable, List, NamedTuple
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+# 一次写入 Chroma 的最大块数，这些块在一次 embed_documents 调用里向量化；
+# CachedEmbeddings 会再按它的 batch_size 拆开并发请求，所以这里要比
+# batch_size × max_concurrency（默认 256 × 4）大，否则并发用不上
+ADD_BATCH_SIZE = 4096
+
+
+class SyncResult(NamedTuple):
+    added: int
+    skipped: int
+    deleted: int
+
+
+def chunk_id(doc: Document) -> str:
+    """文档块的内容哈希，作为它在向量库中的 id"""
+    source = str(doc.metadata.get("source", ""))
+    digest = hashlib.sha256()
+    digest.update(source.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(doc.page_content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def open_store(embedding: Embeddings, collection_name: str, persist_directory: str) -> Chroma:
+    """打开（不存在时创建）持久化的向量库"""
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embedding,
+        persist_directory=persist_directory,
+    )
+
+
+def sync_documents(
+    store: Chroma,
+    documents: Iterable[Document],
+    batch_size: int = ADD_BATCH_SIZE,
+) -> SyncResult:
+    """
+    让向量库中的内容与 documents 一致
+    documents 是这次加载的全部文档块：向量库中不在其中的块（来源已经消失，
+    或者来源的内容变了）都会被删除
+    """
+    wanted = {}
+    for doc in documents:
+        wanted.setdefault(chunk_id(doc), doc)
+
+    # 只取 id，不取向量和正文
+    existing = set(store.get(include=[])["ids"])
+
+    new_ids: List[str] = [i for i in wanted if i not in existing]
+    for start in range(0, len(new_ids), batch_size):
+        ids = new_ids[start:start + batch_size]
+        store.add_documents([wanted[i] for i in ids], ids=ids)
+
+    # 来源消失或内容改变后留下的旧块
+    stale = [i for i in existing if i not in wanted]
+    for start in range(0, len(stale), batch_size):
+        store.delete(ids=stale[start:start + batch_size])
+
+    return SyncResult(added=len(new_ids), skipped=len(wanted) - len(new_ids), deleted=len(stale))
+
+
+def rebuild(store: Chroma, documents: Iterable[Document], batch_size: int = ADD_BATCH_SIZE) -> SyncResult:
+    """清空集合后重新写入所有文档块"""
+    ids = store.get(include=[])["ids"]
+    for start in range(0, len(ids), batch_size):
+        store.delete(ids=ids[start:start + batch_size])
+    result = sync_documents(store, documents, batch_size=batch_size)
+    return result._replace(deleted=len(ids))
+
+
+if __name__ == "__main__":
+    # 离线自检：用假的向量模型和本地文档验证新增 / 跳过 / 删除
+    import tempfile
+
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+
+    class CountingEmbedding(DeterministicFakeEmbedding):
+        embedded: int = 0
+
+        def embed_documents(self, texts: List[str]) -> List[List[float]]:
+            self.embedded += len(texts)
+            return super().embed_documents(texts)
+
+    def docs(*pages):
+        return [Document(page_content=text, metadata={"source": source}) for source, text in pages]
+
+    embedding = CountingEmbedding(size=16)
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_store(embedding, collection_name="self_check", persist_directory=directory)
+
+        result = sync_documents(store, docs(("a", "一"), ("a", "二"), ("b", "三"), ("b", "三")))
+        assert result == SyncResult(added=3, skipped=0, deleted=0), result
+        assert embedding.embedded == 3
+
+        # 内容不变：全部跳过，不再向量化
+        result = sync_documents(store, docs(("a", "一"), ("a", "二"), ("b", "三")))
+        assert result == SyncResult(added=0, skipped=3, deleted=0), result
+        assert embedding.embedded == 3
+
+        # a 的第二块改了，b 被删掉：只向量化改过的块，旧块和 b 都删除
+        result = sync_documents(store, docs(("a", "一"), ("a", "二改")))
+        assert result == SyncResult(added=1, skipped=1, deleted=2), result
+        assert embedding.embedded == 4
+        assert sorted(store.get()["documents"]) == ["一", "二改"]
+
+        # 重新打开持久化的集合，内容还在
+        store = open_store(embedding, collection_name="self_check", persist_directory=directory)
+        result = sync_documents(store, docs(("a", "一"), ("a", "二改")))
+        assert result == SyncResult(added=0, skipped=2, deleted=0), result
+
+        result = rebuild(store, docs(("a", "一")))
+        assert result == SyncResult(added=1, skipped=0, deleted=2), result
+        assert embedding.embedded == 5
+    print("rag_index 自检通过")
@@ -0,0 +1,181 @@
+"""
+回答缓存
+
+FAQ 类的问题大量重复，每次都请求 LLM 要等好几秒。ResponseCache 分两层：
+- 精确匹配：问题规范化（全角转半角、转小写、合并空白）后完全相同，直接返回
+- 语义匹配：问题向量和已缓存问题的余弦相似度超过 threshold 时，返回那个问题的回答
+条目超过 ttl 秒后失效；条目数超过 max_entries 时淘汰最久没用过的。
+stats() 返回两层各自的命中次数和未命中次数。
+
+回答依赖上下文（例如多轮对话的历史）时，把上下文的摘要作为 context 传入：
+只有 context 相同的条目才会命中，两层都一样。
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy
+from langchain_core.embeddings import Embeddings
+
+# 语义匹配的相似度阈值
+SIMILARITY_THRESHOLD = 0.95
+MAX_ENTRIES = 1000
+# 缓存有效期（秒）
+TTL = 3600.0
+# get() 算出的问题向量暂存起来，随后 put() 同一个问题时不用再算一次
+PENDING_VECTORS = 64
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(prompt: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", prompt)).strip().casefold()
+
+
+# 缓存条目的 key：(context, 规范化后的问题)
+Key = Tuple[str, str]
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "slot")
+
+    def __init__(self, value: Any, expires_at: float, slot: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.slot = slot
+
+
+class ResponseCache:
+    """精确匹配 + 语义匹配两层的回答缓存，可以在多个线程之间共享"""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = SIMILARITY_THRESHOLD,
+        max_entries: int = MAX_ENTRIES,
+        ttl: float = TTL,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        # key -> 条目，按最近使用排序
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        # 第 i 行是占用第 i 个位置的问题的单位向量；_slot_keys[i] 为 None 表示位置空闲
+        self._vectors: Optional[numpy.ndarray] = None
+        self._slot_keys: List[Optional[Key]] = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._pending: "OrderedDict[Key, numpy.ndarray]" = OrderedDict()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _embed(self, key: Key) -> numpy.ndarray:
+        # 只对问题本身向量化，context 另外比较
+        vector = numpy.asarray(self.embeddings.embed_query(key[1]), dtype=numpy.float32)
+        norm = numpy.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key: Key) -> None:
+        entry = self._entries.pop(key)
+        self._slot_keys[entry.slot] = None
+        self._vectors[entry.slot] = 0.0
+        self._free_slots.append(entry.slot)
+
+    def get(self, prompt: str, context: str = "") -> Optional[Any]:
+        """返回 context 下缓存的回答，没有时返回 None"""
+        key = (context, normalize(prompt))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry.value
+                self._remove(key)
+            if not self._entries:
+                self.misses += 1
+                return None
+
+        # 向量化可能要请求接口，不在锁内进行
+        vector = self._embed(key)
+        with self._lock:
+            self._pending[key] = vector
+            if len(self._pending) > PENDING_VECTORS:
+                self._pending.popitem(last=False)
+
+            if self._vectors is not None and len(vector) == self._vectors.shape[1]:
+                scores = self._vectors @ vector
+                # 空闲位置的向量是 0，相似度为 0，不会超过阈值
+                while True:
+                    slot = int(numpy.argmax(scores))
+                    if scores[slot] < self.threshold:
+                        break
+                    match = self._slot_keys[slot]
+                    if match[0] != context:
+                        # 其他上下文下的回答，看下一个最相似的
+                        scores[slot] = -1.0
+                        continue
+                    entry = self._entries[match]
+                    if entry.expires_at > now:
+                        self._entries.move_to_end(match)
+                        self.semantic_hits += 1
+                        return entry.value
+                    # 过期了，删掉后看下一个最相似的
+                    self._remove(match)
+                    scores[slot] = -1.0
+            self.misses += 1
+            return None
+
+    def put(self, prompt: str, value: Any, context: str = "") -> None:
+        key = (context, normalize(prompt))
+        with self._lock:
+            vector = self._pending.pop(key, None)
+        if vector is None:
+            vector = self._embed(key)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while not self._free_slots:
+                self._remove(next(iter(self._entries)))
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                # 第一次写入（或换了向量模型）时按向量维度分配矩阵
+                for old_key in list(self._entries):
+                    self._remove(old_key)
+                self._vectors = numpy.zeros((self.max_entries, len(vector)), dtype=numpy.float32)
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._slot_keys[slot] = key
+            self._entries[key] = _Entry(value, time.monotonic() + self.ttl, slot)
+
+    def call(self, prompt: str, compute: Callable[[str], Any], context: str = "") -> Any:
+        """有缓存时返回缓存的回答，否则调用 compute(prompt) 并缓存结果"""
+        value = self.get(prompt, context)
+        if value is None:
+            value = compute(prompt)
+            self.put(prompt, value, context)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+            self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -1,143 +1,277 @@
-"""
-一个集成工具调用、RAG、输出解析与记忆的 LangChain Agent 示例
-"""
-import os, uuid
-from typing import List
-from pydantic import BaseModel, Field
-
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_community.utilities import SerpAPIWrapper
-from langchain_community.tools import Tool
-
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain.tools import StructuredTool
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema.runnable import RunnablePassthrough
-from langchain.schema.output_parser import StrOutputParser
-
-# ---------- 1. 初始化 LLM ----------
-llm = ChatOpenAI(model="gpt-3.5-turbo-1106", temperature=0)
-
-# ---------- 2. 工具 ----------
-# 2.1 搜索工具（使用 SerpAPI；也可换成 DuckDuckGoSearchRun）
-search = SerpAPIWrapper()
-
-# 2.2 计算工具
-def calculator(expression: str) -> str:
-    """
-    计算数学表达式并返回字符串结果
-    例如: "3**5 / 7"
-    """
-    try:
-        ans = eval(expression, {"__builtins__": None}, {})
-        return str(ans)
-    except Exception as e:
-        return f"计算错误: {e}"
-
-calc_tool = StructuredTool.from_function(
-    func=calculator,
-    name="Calculator",
-    description="执行数学表达式，例如 2+3*4 或 3**5/7"
-)
-
-tools = [
-    Tool(name="Search", func=search.run, description="实时互联网搜索"),
-    calc_tool
-]
-
-# ---------- 3. RAG ----------
-# 3.1 加载并切分文档（这里用 LangChain 官方博客做示例）
-loader = WebBaseLoader(["https://blog.langchain.dev/"])
-docs = loader.load()
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=50)
-splits = text_splitter.split_documents(docs)
-
-# 3.2 向量存储
-embedding = OpenAIEmbeddings()
-vectordb = Chroma.from_documents(
-    documents=splits,
-    embedding=embedding,
-    collection_name="langchain_blog",
-    persist_directory="./chroma_db"
-)
-retriever = vectordb.as_retriever(search_kwargs={"k": 3})
-
-# 3.3 RAG chain（独立检索器，供 Agent 调用）
-rag_chain = (
-    {"context": retriever | (lambda docs: "\n".join(d.page_content for d in docs)),
-     "question": RunnablePassthrough()}
-    | ChatPromptTemplate.from_template(
-        "你是 LangChain 助手，根据以下上下文回答用户问题：\n{context}\n用户问题：{question}")
-    | llm
-    | StrOutputParser()
-)
-
-# 把检索器封装成工具，使 Agent 可以调用
-def rag_tool_func(query: str) -> str:
-    return rag_chain.invoke(query)
-
-rag_tool = Tool(
-    name="LangChainBlogRetriever",
-    func=rag_tool_func,
-    description="从 LangChain 官方博客检索相关信息，回答技术问题"
-)
-tools.append(rag_tool)
-
-# ---------- 4. 记忆 ----------
-memory = ConversationBufferMemory(
-    memory_key="chat_history",
-    return_messages=True
-)
-
-# ---------- 5. 输出解析 ----------
-class AgentOutput(BaseModel):
-    answer: str = Field(description="最终给用户看的答案")
-    sources: List[str] = Field(default_factory=list, description="参考来源链接")
-
-# 5.1 定义系统提示
-system_prompt = ChatPromptTemplate.from_messages([
-    ("system",
-     "你是全能助手，可使用工具：搜索、计算、知识库检索。请按以下 JSON 格式回答：\n"
-     '{"answer": "...", "sources": ["..."]}'),
-    MessagesPlaceholder(variable_name="chat_history"),
-    ("human", "{input}"),
-    MessagesPlaceholder(variable_name="agent_scratchpad")
-])
-
-# 5.2 创建 agent
-agent = create_openai_tools_agent(llm, tools, system_prompt)
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools,
-    memory=memory,
-    verbose=True,
-    return_intermediate_steps=True
-)
-
-# ---------- 6. 封装运行函数 ----------
-def run_agent(query: str) -> AgentOutput:
-    result = agent_executor.invoke({"input": query})
-    # 简单解析：把 LLM 输出当 json
-    import json
-    try:
-        data = json.loads(result["output"])
-    except Exception:
-        # 如果 LLM 没返回合法 JSON，就兜底
-        data = {"answer": result["output"], "sources": []}
-    return AgentOutput(**data)
-
-# ---------- 7. 测试 ----------
-if __name__ == "__main__":
-    while True:
-        q = input("\n用户> ")
-        if q in {"exit", "quit"}:
-            break
-        resp = run_agent(q)
-        print("助手> ", resp.answer)
-        if resp.sources:
-            print("来源> ", resp.sources)
\ No newline at end of file
+"""
+一个集成工具调用、RAG、输出解析与记忆的 LangChain Agent 示例
+"""
+import ast
+import asyncio
+import hashlib
+import operator
+import os, uuid
+from typing import List
+from pydantic import BaseModel, Field
+
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_community.document_loaders import WebBaseLoader
+from langchain_community.tools import DuckDuckGoSearchRun
+from langchain_community.utilities import SerpAPIWrapper
+from langchain_community.tools import Tool
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain.tools import StructuredTool
+from langchain.memory import ConversationBufferMemory
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.schema.runnable import RunnablePassthrough
+from langchain.schema.output_parser import StrOutputParser
+
+from agent_stream import parse_output, stream_agent
+from async_runtime import AsyncAgentRuntime, AsyncToolExecutor
+from embedding_cache import CachedEmbeddings
+from rag_index import open_store, rebuild, sync_documents
+from response_cache import ResponseCache
+
+# ---------- 1. 初始化 LLM ----------
+llm = ChatOpenAI(model="gpt-3.5-turbo-1106", temperature=0)
+
+# ---------- 2. 工具 ----------
+# 2.1 搜索工具（使用 SerpAPI；也可换成 DuckDuckGoSearchRun）
+search = SerpAPIWrapper()
+
+# 2.2 计算工具
+# 只支持数字和四则、整除、取模、乘方运算；整数结果最多 MAX_RESULT_BITS 位。
+# 工具超时后线程不会被停止，9**9**9**9 这类表达式必须在算之前就拒绝
+MAX_EXPRESSION_LENGTH = 200
+MAX_RESULT_BITS = 4096
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+def _evaluate(node):
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left = _evaluate(node.left)
+        right = _evaluate(node.right)
+        if (
+            isinstance(node.op, ast.Pow) and type(left) is int and type(right) is int
+            and abs(left) > 1 and right * (left.bit_length() - 1) >= MAX_RESULT_BITS
+        ):
+            raise ValueError("结果太大")
+        result = _BINARY_OPS[type(node.op)](left, right)
+        if type(result) is int and result.bit_length() > MAX_RESULT_BITS:
+            raise ValueError("结果太大")
+        return result
+    raise ValueError("只支持数字和 + - * / // % ** 运算")
+
+def calculator(expression: str) -> str:
+    """
+    计算数学表达式并返回字符串结果
+    例如: "3**5 / 7"
+    """
+    try:
+        if len(expression) > MAX_EXPRESSION_LENGTH:
+            raise ValueError("表达式太长")
+        ans = _evaluate(ast.parse(expression, mode="eval").body)
+        return str(ans)
+    except Exception as e:
+        return f"计算错误: {e}"
+
+calc_tool = StructuredTool.from_function(
+    func=calculator,
+    name="Calculator",
+    description="执行数学表达式，例如 2+3*4 或 3**5/7"
+)
+
+tools = [
+    # coroutine 供异步运行时使用，等待搜索结果时不占用线程
+    Tool(name="Search", func=search.run, coroutine=search.arun, description="实时互联网搜索"),
+    calc_tool
+]
+
+# ---------- 3. RAG ----------
+# 3.1 加载并切分文档（这里用 LangChain 官方博客做示例）
+loader = WebBaseLoader(["https://blog.langchain.dev/"])
+docs = loader.load()
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=50)
+splits = text_splitter.split_documents(docs)
+
+# 3.2 向量存储
+# 打开 ./chroma_db 中已有的集合，只为新增或改动过的块计算向量，删掉已经不存在的块；
+# 设置环境变量 RAG_REBUILD=1 时清空后全部重建
+# 向量缓存在 ./embedding_cache.sqlite，同样的文本（包括重复的查询）不会再次请求向量化接口
+embedding = CachedEmbeddings(OpenAIEmbeddings(), "./embedding_cache.sqlite")
+vectordb = open_store(embedding, collection_name="langchain_blog", persist_directory="./chroma_db")
+if os.environ.get("RAG_REBUILD") == "1":
+    sync_result = rebuild(vectordb, splits)
+else:
+    sync_result = sync_documents(vectordb, splits)
+print(f"向量库：新增 {sync_result.added} 块，跳过 {sync_result.skipped} 块，删除 {sync_result.deleted} 块")
+retriever = vectordb.as_retriever(search_kwargs={"k": 3})
+
+# 3.3 RAG chain（独立检索器，供 Agent 调用）
+rag_chain = (
+    {"context": retriever | (lambda docs: "\n".join(d.page_content for d in docs)),
+     "question": RunnablePassthrough()}
+    | ChatPromptTemplate.from_template(
+        "你是 LangChain 助手，根据以下上下文回答用户问题：\n{context}\n用户问题：{question}")
+    | llm
+    | StrOutputParser()
+)
+
+# 相同或意思几乎相同的问题直接返回缓存的回答，不再请求 LLM；
+# 知识库检索与对话无关，agent 的回答则只在对话历史相同时复用（见 history_key）
+rag_cache = ResponseCache(embedding)
+agent_cache = ResponseCache(embedding)
+
+# 把检索器封装成工具，使 Agent 可以调用
+def rag_tool_func(query: str) -> str:
+    return rag_cache.call(query, rag_chain.invoke)
+
+async def arag_tool_func(query: str) -> str:
+    # 缓存查找会读本地数据库、可能请求向量化接口，放到线程里
+    cached = await asyncio.to_thread(rag_cache.get, query)
+    if cached is not None:
+        return cached
+    answer = await rag_chain.ainvoke(query)
+    await asyncio.to_thread(rag_cache.put, query, answer)
+    return answer
+
+rag_tool = Tool(
+    name="LangChainBlogRetriever",
+    func=rag_tool_func,
+    coroutine=arag_tool_func,
+    description="从 LangChain 官方博客检索相关信息，回答技术问题"
+)
+tools.append(rag_tool)
+
+# ---------- 4. 记忆 ----------
+memory = ConversationBufferMemory(
+    memory_key="chat_history",
+    return_messages=True
+)
+
+# ---------- 5. 输出解析 ----------
+class AgentOutput(BaseModel):
+    answer: str = Field(description="最终给用户看的答案")
+    sources: List[str] = Field(default_factory=list, description="参考来源链接")
+
+# 5.1 定义系统提示
+SYSTEM_MESSAGE = (
+    "你是全能助手，可使用工具：搜索、计算、知识库检索。请按以下 JSON 格式回答：\n"
+    '{"answer": "...", "sources": ["..."]}'
+)
+system_prompt = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_MESSAGE),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("human", "{input}"),
+    MessagesPlaceholder(variable_name="agent_scratchpad")
+])
+
+# 5.2 创建 agent
+agent = create_openai_tools_agent(llm, tools, system_prompt)
+agent_executor = AgentExecutor(
+    agent=agent,
+    tools=tools,
+    memory=memory,
+    verbose=True,
+    return_intermediate_steps=True
+)
+
+# 5.3 异步运行时：一轮中的多个工具调用并发执行，一个进程同时服务多个会话
+runtime = AsyncAgentRuntime(
+    llm,
+    tools,
+    SYSTEM_MESSAGE,
+    executor=AsyncToolExecutor(tools, timeouts={"Search": 15, "Calculator": 2, "LangChainBlogRetriever": 30}),
+)
+
+# ---------- 6. 封装运行函数 ----------
+def history_key() -> str:
+    """
+    当前对话历史的摘要，作为 agent_cache 的 context：
+    “说详细一点”这类追问的答案取决于前文，只能在前文完全相同时复用
+    """
+    messages = memory.chat_memory.messages
+    if not messages:
+        return ""
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(f"{message.type}\0{message.content}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+def run_agent(query: str) -> AgentOutput:
+    context = history_key()
+    cached = agent_cache.get(query, context)
+    if cached is not None:
+        # 命中缓存时也记入对话历史，后续提问的上下文保持完整
+        memory.save_context({"input": query}, {"output": cached.answer})
+        return cached
+    output = _invoke_agent(query)
+    agent_cache.put(query, output, context)
+    return output
+
+def _invoke_agent(query: str) -> AgentOutput:
+    result = agent_executor.invoke({"input": query})
+    # 把 LLM 输出当 json 解析；如果 LLM 没返回合法 JSON，整段输出作为答案
+    return AgentOutput(**parse_output(result["output"]))
+
+async def arun_agent(query: str, session_id: str = "default") -> AgentOutput:
+    """run_agent 的异步版本，每个 session_id 有独立的对话历史"""
+    answer = await runtime.run(session_id, query)
+    return AgentOutput(**parse_output(answer))
+
+async def astream_agent(query: str):
+    """
+    run_agent 的流式版本：异步生成器，边运行边给出 token、工具调用和 answer 的增量，
+    最后一个事件 {"type": "final", ...} 带完整的 AgentOutput（事件格式见 agent_stream.py）
+    """
+    context = history_key()
+    cached = agent_cache.get(query, context)
+    if cached is not None:
+        memory.save_context({"input": query}, {"output": cached.answer})
+        yield {"type": "answer", "text": cached.answer}
+        yield {"type": "final", "output": cached}
+        return
+    async for event in stream_agent(agent_executor, {"input": query}):
+        if event["type"] == "final":
+            output = AgentOutput(answer=event["answer"], sources=event["sources"])
+            agent_cache.put(query, output, context)
+            yield {"type": "final", "output": output}
+        else:
+            yield event
+
+# ---------- 7. 测试 ----------
+async def chat():
+    while True:
+        # input() 会阻塞，放到线程里执行，不占用事件循环
+        q = await asyncio.to_thread(input, "\n用户> ")
+        if q in {"exit", "quit"}:
+            break
+        if q == "stats":
+            print("回答缓存> ", agent_cache.stats())
+            print("知识库缓存> ", rag_cache.stats())
+            continue
+        answering = False
+        async for event in astream_agent(q):
+            if event["type"] == "tool_start":
+                print(f"[调用工具 {event['tool']}: {event['input']}]", flush=True)
+            elif event["type"] == "answer":
+                if not answering:
+                    print("助手> ", end="", flush=True)
+                    answering = True
+                print(event["text"], end="", flush=True)
+            elif event["type"] == "final":
+                print()
+                if event["output"].sources:
+                    print("来源> ", event["output"].sources)
+
+if __name__ == "__main__":
+    asyncio.run(chat())
@@ -1,43 +1,219 @@
+import os
+import struct
+import tempfile
+
 import numpy
 import scipy.special
 
+# 权重文件格式：固定长度的文件头，之后依次是 wih、who（int8 时先是两个矩阵的每行缩放系数），
+# 每段都按 ALIGNMENT 字节对齐，float32 的文件可以直接内存映射成权重矩阵
+MAGIC = b"NNWT"
+FORMAT_VERSION = 1
+# 魔数、版本、数据类型、输入/隐藏/输出节点数、学习率
+HEADER = struct.Struct("<4sHHIIId")
+HEADER_SIZE = 64
+ALIGNMENT = 64
+DTYPES = {0: numpy.float32, 1: numpy.float16, 2: numpy.int8}
+DTYPE_CODES = {numpy.dtype(dtype): code for code, dtype in DTYPES.items()}
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _layout(code, hnodes, inodes, onodes):
+    """各段在文件中的 (偏移, 形状, 类型)，顺序为 [wih 缩放, who 缩放,] wih, who"""
+    sections = []
+    if DTYPES[code] is numpy.int8:
+        sections += [((hnodes,), numpy.float32), ((onodes,), numpy.float32)]
+    sections += [((hnodes, inodes), DTYPES[code]), ((onodes, hnodes), DTYPES[code])]
+    layout = []
+    offset = HEADER_SIZE
+    for shape, dtype in sections:
+        layout.append((offset, shape, dtype))
+        offset = _aligned(offset + int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize)
+    return layout
+
+
+def _quantize(weights):
+    """按行对称量化成 int8，返回 (int8 矩阵, 每行的缩放系数)"""
+    scales = numpy.abs(weights).max(axis=1).astype(numpy.float32) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = numpy.rint(weights / scales[:, None]).clip(-127, 127).astype(numpy.int8)
+    return quantized, scales
+
 
 class NeuralNetwork:
-    def __init__():
+    """
+    三层（输入层、隐藏层、输出层）神经网络，激活函数为 sigmoid
+
+    train() 和 query() 一次处理一批样本：inputs 是 (样本数, 输入节点数) 的二维数组，
+    每一行是一个样本，整批用矩阵乘法一次算完，不逐个样本循环。
+    也可以传一维数组表示单个样本。
+    """
+
+    def __init__(self, inputnodes, hiddennodes, outputnodes, learningrate, dtype=numpy.float32, seed=None):
         self.inodes = inputnodes
         self.hnodes = hiddennodes
         self.onodes = outputnodes
 
         self.lr = learningrate
 
-        self.wih = (numpy.random.rand(self.hnodes, self.inodes) - 0.5)
-        self.who = (numpy,random.rand(self.onodes, self.hnodes) - 0.5)
-        # wih = weights input to hidden layer
-        # who = weights hidden to output layer
-        # 从随机数构建两个链接权重矩阵
-
-        #也可以使用更高级的随机数构建方法,使用正态概率分布采样权重
-        #self.wih = numpy.random.normal(0.0, pow(self.hnodes, -0.5), (self.hnodes, self.inodes))
-        #self.who = numpy.random.normal(0.0, pow(self.onodes, -0.5), (self.onodes, self.hnodes))
+        # wih = weights input to hidden layer，形状 (hnodes, inodes)
+        # who = weights hidden to output layer，形状 (onodes, hnodes)
+        # 从正态概率分布采样权重，标准差为下一层节点数的 -0.5 次方
+        #（最简单的做法是 numpy.random.rand(self.hnodes, self.inodes) - 0.5）
+        rng = numpy.random.default_rng(seed)
+        self.wih = rng.normal(0.0, pow(self.hnodes, -0.5), (self.hnodes, self.inodes)).astype(dtype)
+        self.who = rng.normal(0.0, pow(self.onodes, -0.5), (self.onodes, self.hnodes)).astype(dtype)
         '''
         函数 numpy.random.normal(loc=0.0, scale=1.0, size=None) 的参数含义如下：
         loc：正态分布的均值（平均值）。默认为 0.0。
         scale：正态分布的标准差。默认为 1.0。
         size：输出的形状。如果给定一个整数，则返回一个具有该长度的一维数组；如果给定一个元组，则返回一个具有指定维度的数组。'''
-        pass
 
-    def trian():
-        pass
+        # 激活函数 sigmoid
+        self.activation_function = scipy.special.expit
+
+    def _as_batch(self, array):
+        # 转成和权重相同的类型；已经是这个类型的二维数组时不复制
+        return numpy.atleast_2d(numpy.asarray(array, dtype=self.wih.dtype))
+
+    def _forward(self, inputs):
+        # 每一行是一个样本：(n, inodes) @ (inodes, hnodes) -> (n, hnodes)
+        hidden_outputs = self.activation_function(inputs @ self.wih.T)
+        final_outputs = self.activation_function(hidden_outputs @ self.who.T)
+        return hidden_outputs, final_outputs
+
+    def train(self, inputs_list, targets_list):
+        """
+        用一批样本做一次梯度下降
+        梯度按样本数取平均，所以每批一个样本时和逐个样本训练完全相同，
+        换更大的批时不用调整学习率
+        """
+        inputs = self._as_batch(inputs_list)
+        targets = self._as_batch(targets_list)
+        hidden_outputs, final_outputs = self._forward(inputs)
+
+        # 输出层误差，再按链接权重反向分配到隐藏层（用更新前的 who）
+        output_errors = targets - final_outputs
+        hidden_errors = output_errors @ self.who
+
+        # 误差乘以 sigmoid 的导数 o * (1 - o)，原地计算，不产生额外的临时数组
+        output_errors *= final_outputs
+        output_errors *= 1.0 - final_outputs
+        hidden_errors *= hidden_outputs
+        hidden_errors *= 1.0 - hidden_outputs
+
+        # 原地更新权重
+        scale = self.lr / inputs.shape[0]
+        delta_who = output_errors.T @ hidden_outputs
+        delta_who *= scale
+        self.who += delta_who
+        delta_wih = hidden_errors.T @ inputs
+        delta_wih *= scale
+        self.wih += delta_wih
+
+        return final_outputs
+
+    def query(self, inputs_list):
+        """返回网络的输出；输入是一维数组时返回一维数组"""
+        inputs = numpy.asarray(inputs_list)
+        _, final_outputs = self._forward(self._as_batch(inputs))
+        return final_outputs[0] if inputs.ndim == 1 else final_outputs
+
+    def save(self, path, dtype=numpy.float32):
+        """
+        保存权重；dtype 可以是 float32、float16 或 int8（每行一个缩放系数的对称量化），
+        后两种只用于推理，文件分别只有 float32 的 1/2 和 1/4
+        先写临时文件再替换，正在读取旧文件的进程不受影响
+        """
+        code = DTYPE_CODES.get(numpy.dtype(dtype))
+        if code is None:
+            raise ValueError(f"不支持的权重类型: {dtype}")
+        if DTYPES[code] is numpy.int8:
+            wih, wih_scales = _quantize(self.wih)
+            who, who_scales = _quantize(self.who)
+            sections = [wih_scales, who_scales, wih, who]
+        else:
+            sections = [self.wih.astype(dtype, copy=False), self.who.astype(dtype, copy=False)]
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, code, self.inodes, self.hnodes, self.onodes, self.lr)
+        layout = _layout(code, self.hnodes, self.inodes, self.onodes)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header.ljust(HEADER_SIZE, b"\0"))
+                for (offset, _, section_dtype), array in zip(layout, sections):
+                    f.seek(offset)
+                    f.write(numpy.ascontiguousarray(array, dtype=section_dtype).tobytes())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        读取 save() 保存的权重
+        float32 的文件在 mmap=True 时直接映射成权重矩阵（写时复制），几乎不花时间，
+        多个进程加载同一个文件时共享内存页；float16 / int8 的文件会还原成 float32
+        """
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER.size:
+            raise ValueError(f"不是权重文件: {path}")
+        magic, version, code, inodes, hnodes, onodes, lr = HEADER.unpack_from(header)
+        if magic != MAGIC or code not in DTYPES:
+            raise ValueError(f"不是权重文件: {path}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"不支持的权重文件版本: {version}")
+
+        layout = _layout(code, hnodes, inodes, onodes)
+        if mmap:
+            # mode="c"：读取时共享文件的页，继续训练时修改的页在本进程内复制，不写回文件
+            sections = [numpy.memmap(path, dtype=dtype, mode="c", offset=offset, shape=shape)
+                        for offset, shape, dtype in layout]
+        else:
+            with open(path, "rb") as f:
+                sections = []
+                for offset, shape, dtype in layout:
+                    f.seek(offset)
+                    sections.append(numpy.fromfile(f, dtype=dtype, count=int(numpy.prod(shape))).reshape(shape))
+
+        if DTYPES[code] is numpy.int8:
+            wih_scales, who_scales, wih, who = sections
+            wih = wih.astype(numpy.float32) * wih_scales[:, None]
+            who = who.astype(numpy.float32) * who_scales[:, None]
+        else:
+            wih, who = (section.astype(numpy.float32, copy=False) for section in sections)
+
+        network = cls.__new__(cls)
+        network.inodes = inodes
+        network.hnodes = hnodes
+        network.onodes = onodes
+        network.lr = lr
+        network.wih = wih
+        network.who = who
+        network.activation_function = scipy.special.expit
+        return network
 
-    def query():
-        hidden_inputs = numpy.dot(self.wih, inputs)
-        pass
 
-input_nodes = 3
-hidden_nodes = 3
-output_nodes = 3
+if __name__ == "__main__":
+    input_nodes = 3
+    hidden_nodes = 3
+    output_nodes = 3
 
-learning_rate = 0.3
+    learning_rate = 0.3
 
-n = NeuralNetwork(input_nodes, hidden_nodes, output_nodes, learning_rate)
+    n = NeuralNetwork(input_nodes, hidden_nodes, output_nodes, learning_rate, seed=0)
 
+    # 学习把输入原样输出：输入和目标都是 0.01 ~ 0.99 之间的数
+    samples = numpy.random.default_rng(0).uniform(0.01, 0.99, (1000, input_nodes))
+    for epoch in range(200):
+        for start in range(0, len(samples), 32):
+            batch = samples[start:start + 32]
+            n.train(batch, batch)
+    print(n.query([0.2, 0.5, 0.8]))